@@ -21,8 +21,9 @@ django_asgi_app = get_asgi_application()
 
 # Import routing after Django setup
 from quiz import routing
+from quiz.timers import round_timers
 
-application = ProtocolTypeRouter({
+router = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AllowedHostsOriginValidator(
         AuthMiddlewareStack(
@@ -32,3 +33,9 @@ application = ProtocolTypeRouter({
         )
     ),
 })
+
+
+async def application(scope, receive, send):
+    # Round deadline timers run on the server's event loop, started by the first connection
+    round_timers.ensure_started()
+    return await router(scope, receive, send)
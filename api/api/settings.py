@@ -153,6 +153,31 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Game settings
+
+# Answer matching strategy per question category ('exact', 'contains', 'token_set'
+# or 'ngram'). Questions can override this with Question.match_strategy.
+ANSWER_MATCH_STRATEGIES = {
+    # 'creative_fun': 'token_set',
+}
+
+# Seconds between write-behind flushes of games played over the socket in
+# real-time mode (see quiz/live.py)
+LIVE_GAME_FLUSH_INTERVAL = 0.25
+
+# Seconds between batched writes of chat messages sent over the socket
+# (see quiz/chat.py)
+CHAT_FLUSH_INTERVAL = 0.05
+
+# Seconds players have to answer before a round completes without them
+# (missing answers score zero). None disables round deadlines.
+GAME_ROUND_TIMEOUT = 60 * 60 * 24
+
+# Sessions with at least this many participants are played as large rooms:
+# answer slots are created as players answer, and progress goes out as a
+# periodic tally instead of an event per answer.
+LARGE_ROOM_SIZE = 50
+
 # Channels Configuration
 
 
@@ -0,0 +1,83 @@
+"""
+Archival of finished game sessions. A session's rounds, turns and final scores
+are folded into one compressed snapshot row and deleted from the hot tables;
+the session row itself stays so membership checks and links keep working.
+"""
+import json
+import zlib
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, F, Max, OuterRef
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .concurrency import StaleWrite, compare_and_swap
+from .models import ArchivedGameSession, GameRound, GameScore, GameSession, GameTurn
+
+
+def archivable_sessions(idle_days=None, include_active=False):
+    """
+    Sessions ready to archive: ended ones, or with `idle_days` those ended with
+    nothing played for that many days. `include_active` adds active sessions
+    idle that long with no open round; games nobody ended can still be resumed,
+    so they are only archived when asked for.
+    """
+    sessions = GameSession.objects.filter(GameSession.unhosted(), archive__isnull=True)
+    if idle_days is None:
+        return sessions.filter(is_active=False)
+    if not include_active:
+        sessions = sessions.filter(is_active=False)
+
+    cutoff = timezone.now() - timedelta(days=idle_days)
+    idle = sessions.annotate(
+        last_played=Coalesce(Max('rounds__created_at'), 'created_at'),
+        has_open_round=Exists(GameRound.objects.filter(session=OuterRef('pk'), is_completed=False)),
+    ).filter(last_played__lt=cutoff, has_open_round=False)
+    return GameSession.objects.filter(pk__in=idle.values('pk'))
+
+
+def archive_session(session):
+    """
+    Snapshot a session's rounds and scores, then delete their rows. Returns the
+    archive; raises StaleWrite, archiving nothing, if the game is hosted, an
+    active one has an open round, or it changed at all while this ran.
+    """
+    from .serializers import GameRoundSerializer
+
+    with transaction.atomic():
+        # Picks and answers update the session row first, so with it locked none
+        # can land between the snapshot and the deletes
+        version, is_active = GameSession.objects.select_for_update().filter(pk=session.pk).values_list(
+            'version', 'is_active'
+        ).get()
+        hosted = not GameSession.objects.filter(GameSession.unhosted(), pk=session.pk).exists()
+        if hosted or (is_active and GameRound.objects.filter(session=session, is_completed=False).exists()):
+            raise StaleWrite(f'GameSession {session.pk} is being played')
+
+        rounds = GameRound.objects.filter(session=session).select_related('question', 'picker').prefetch_related(
+            'answers__player'
+        )
+        rounds_data = GameRoundSerializer(rounds, many=True).data
+        snapshot = {
+            'rounds': rounds_data,
+            'scores': dict(GameScore.objects.filter(session=session).values_list('player__username', 'points')),
+        }
+        archive = ArchivedGameSession.objects.create(
+            session=session,
+            snapshot=zlib.compress(JSONRenderer().render(snapshot), 9),
+            round_count=len(rounds_data),
+        )
+        GameTurn.objects.filter(round__session=session).delete()
+        GameRound.objects.filter(session=session).delete()
+        GameScore.objects.filter(session=session).delete()
+        # Databases without row locks: a write that got in anyway moved the version,
+        # and this rolls the archive back. Pollers holding a version see the change
+        compare_and_swap(GameSession, session.pk, {'version': version}, is_active=False, version=F('version') + 1)
+    return archive
+
+
+def load_snapshot(archive):
+    """The archived {'rounds': [...], 'scores': {...}}, shaped like GameSessionDetailView's response"""
+    return json.loads(zlib.decompress(archive.snapshot))
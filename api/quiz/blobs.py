@@ -0,0 +1,142 @@
+"""
+Content-addressed storage for chat images.
+
+An image is written once to MEDIA_ROOT/chat/, named after the SHA-256 of its
+bytes, together with a thumbnail made when it first arrives. Messages refer to
+its ChatImage row, so the database, socket frames and history pages carry a
+hash and two URLs rather than the image, and the same picture sent any number
+of times is one file.
+"""
+import base64
+import binascii
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import ChatImage
+
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+THUMBNAIL_SIZE = (320, 320)
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class InvalidImage(Exception):
+    """An upload we won't store; the message is meant for the sender"""
+
+
+def decode_image(value):
+    """The bytes of an image sent inline, as a data URL or plain base64"""
+    if value.startswith('data:'):
+        value = value.partition(',')[2]
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise InvalidImage('Image is not valid base64')
+
+
+def blob_names(digest, extension):
+    """Storage names of an image and its thumbnail, fanned out over 256 directories"""
+    prefix = f'chat/{digest[:2]}/{digest}'
+    return f'{prefix}.{extension}', f'{prefix}_thumb.jpg'
+
+
+def make_thumbnail(image):
+    """A JPEG no larger than THUMBNAIL_SIZE, upright and flattened onto white"""
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(THUMBNAIL_SIZE)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=80, optimize=True)
+    return output.getvalue()
+
+
+def write_blob(data, digest=None):
+    """
+    Check that `data` is an image we accept and write it and its thumbnail to
+    storage, unless they are there already. Returns the ChatImage fields.
+    """
+    if not data:
+        raise InvalidImage('Image is empty')
+    if len(data) > MAX_IMAGE_BYTES:
+        raise InvalidImage(f'Images can be at most {MAX_IMAGE_BYTES // (1024 * 1024)} MB')
+    digest = digest or hashlib.sha256(data).hexdigest()
+
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image.verify()
+        image = Image.open(BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise InvalidImage('File is not a supported image')
+    if image.format not in EXTENSIONS:
+        raise InvalidImage('File is not a supported image')
+
+    name, thumbnail_name = blob_names(digest, EXTENSIONS[image.format])
+    # Same name, same bytes: whoever writes first, the file is right
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    if not default_storage.exists(thumbnail_name):
+        thumbnail_name = default_storage.save(thumbnail_name, ContentFile(make_thumbnail(image)))
+
+    return {
+        'sha256': digest,
+        'image': name,
+        'thumbnail': thumbnail_name,
+        'width': image.width,
+        'height': image.height,
+        'size': len(data),
+    }
+
+
+def store_image(data):
+    """The ChatImage for `data`, storing it first if these bytes haven't been seen before"""
+    digest = hashlib.sha256(data).hexdigest()
+    existing = ChatImage.objects.filter(pk=digest).first()
+    if existing is not None:
+        return existing
+    fields = write_blob(data, digest)
+    return ChatImage.objects.get_or_create(sha256=fields.pop('sha256'), defaults=fields)[0]
+
+
+def resolve_image(inline=None, image_id=None):
+    """
+    The ChatImage a new message refers to: one uploaded earlier by its ID, or
+    one sent inline, which is stored now. None when the message has no image.
+    """
+    if image_id:
+        image = ChatImage.objects.filter(pk=image_id).first()
+        if image is None:
+            raise InvalidImage('Image not found')
+        return image
+    if inline:
+        return store_image(decode_image(inline))
+    return None
+
+
+def media_base(scope):
+    """The scheme and host a socket was opened on, so the URLs it is sent are absolute like the API's"""
+    host = dict(scope.get('headers', [])).get(b'host')
+    if not host:
+        return ''
+    scheme = 'https' if scope.get('scheme') == 'wss' else 'http'
+    return f'{scheme}://{host.decode("latin1")}'
+
+
+def image_fields(image, base=''):
+    """The fields a message carries for its image: the hash and where to fetch it and its thumbnail"""
+    if image is None:
+        return {'image_id': None, 'image': None, 'thumbnail': None}
+    return {
+        'image_id': image.sha256,
+        'image': base + image.image.url,
+        'thumbnail': base + image.thumbnail.url,
+    }
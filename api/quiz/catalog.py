@@ -0,0 +1,96 @@
+"""
+Process-wide cache of the question catalog.
+
+Questions only change when the seed/populate management commands run, so each
+worker loads every question once, keeps it pre-rendered as JSON, and only
+reloads after one of those commands bumps the catalog version.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+
+
+class QuestionCatalog:
+    """Immutable snapshot of all questions, keyed for the lookups the views make"""
+
+    def __init__(self, version, questions):
+        from .serializers import QuestionSerializer
+
+        renderer = JSONRenderer()
+        self.version = version
+        self.questions = {}  # Question ID -> Question
+        self.question_json = {}  # Question ID -> rendered JSON bytes
+        category_ids = {}
+        for question in questions:
+            self.questions[question.id] = question
+            self.question_json[question.id] = renderer.render(QuestionSerializer(question).data)
+            category_ids.setdefault(question.category, []).append(question.id)
+
+        # Category -> question IDs in display order
+        self.category_ids = {category: tuple(ids) for category, ids in category_ids.items()}
+        self._category_json = {
+            category: b'[' + b','.join(self.question_json[qid] for qid in ids) + b']'
+            for category, ids in self.category_ids.items()
+        }
+
+        # Every category the model offers, numbered in its order, with how many questions it has
+        from .models import Question
+        self.category_names = dict(Question.CATEGORY_CHOICES)
+        self.categories_json = renderer.render([
+            {'id': number, 'category': category, 'name': name, 'question_count': len(self.category_ids.get(category, ()))}
+            for number, (category, name) in enumerate(Question.CATEGORY_CHOICES, start=1)
+        ])
+
+    def category_json(self, category):
+        """Rendered JSON list of every question in a category"""
+        return self._category_json.get(category, b'[]')
+
+    def random_question_json(self, category=None):
+        """Rendered JSON of a random question, from one category or all; None when there are none"""
+        question_ids = self.category_ids.get(category, ()) if category else tuple(self.questions)
+        if not question_ids:
+            return None
+        return self.question_json[random.choice(question_ids)]
+
+
+_lock = threading.Lock()
+_catalog = None
+_checked_at = 0.0
+
+
+def _current_version():
+    from .models import CatalogVersion
+    return CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def get_catalog():
+    """Return the cached catalog, reloading it if the stored version has moved on"""
+    global _catalog, _checked_at
+
+    interval = getattr(settings, 'QUESTION_CATALOG_CHECK_INTERVAL', 1.0)
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - _checked_at < interval:
+        return catalog
+
+    with _lock:
+        version = _current_version()
+        if _catalog is None or _catalog.version != version:
+            from .models import Question
+            _catalog = QuestionCatalog(version, Question.objects.all())
+        _checked_at = time.monotonic()
+        return _catalog
+
+
+def bump_catalog_version():
+    """Mark the catalog as changed so every worker reloads it on its next check"""
+    global _catalog
+    from .models import CatalogVersion
+
+    CatalogVersion.objects.get_or_create(pk=1)
+    CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1)
+    with _lock:
+        _catalog = None
@@ -0,0 +1,211 @@
+"""
+Group chat over the socket, written behind.
+
+A message sent on a group's chat socket is given its UID and timestamp as it
+arrives, acknowledged and fanned out straight away, and queued. A background
+writer on the event loop turns everything queued in each interval into one
+bulk INSERT on a worker thread, so the loop never waits on a write and SQLite
+sees a few large transactions rather than one per message.
+
+An acknowledged message is in memory until the next flush (CHAT_FLUSH_INTERVAL).
+A batch that fails to write stays queued and is retried with the next one.
+In the same transaction as the INSERT, each group's last message and its
+members' unread counts are brought up to date with one UPDATE apiece.
+
+History is read a page at a time by keyset on (created_at, id), which the
+(group, created_at, id) index serves directly: any page costs one index seek
+and `limit` rows, however long the group's history.
+"""
+import asyncio
+import base64
+import logging
+import re
+from collections import Counter
+from datetime import datetime
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Subquery, Value, When
+from django.db.models.functions import Greatest
+
+from .blobs import image_fields
+from .models import ChatReadCursor, GroupChat, GroupMessage, User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 0.05  # Seconds between batched writes
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+PREVIEW_LENGTH = 50  # Characters of the last message kept on its group
+
+GROUP_ROOM = re.compile(r'group_(\d+)$')
+
+
+def group_room_id(room_name):
+    """The GroupChat ID of a `group_<id>` chat room, or None for rooms that aren't stored"""
+    match = GROUP_ROOM.match(room_name)
+    return int(match.group(1)) if match else None
+
+
+def chat_group_name(group_id):
+    return f'chat_group_{group_id}'
+
+
+def message_event(message, username, base=''):
+    """
+    A stored (or queued) message as the chat group event sent to every member.
+    Its image goes by reference; `base` makes the URLs absolute.
+    """
+    return {
+        'type': 'chat_message',
+        'id': str(message.uid),
+        'message': message.content,
+        'username': username,
+        **image_fields(message.image, base),
+        'timestamp': message.created_at.isoformat(),
+    }
+
+
+def encode_cursor(message):
+    """An opaque cursor at a message's place in the history"""
+    return base64.urlsafe_b64encode(f'{message.created_at.isoformat()}|{message.id}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor. Raises ValueError for anything encode_cursor didn't make."""
+    created_at, _, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition('|')
+    return datetime.fromisoformat(created_at), int(message_id)
+
+
+def message_page(messages, before=None, after=None, limit=PAGE_SIZE):
+    """
+    A page of `messages` (one group's) in chronological order: the latest
+    `limit`, or the `limit` just before or just after a decoded cursor.
+    Returns (page, whether there are more beyond it in the same direction).
+    """
+    if after is not None:
+        created_at, message_id = after
+        # The range on created_at is what the index seeks on; the exclude settles ties
+        messages = messages.filter(created_at__gte=created_at).exclude(created_at=created_at, id__lte=message_id)
+        messages = messages.order_by('created_at', 'id')
+    else:
+        if before is not None:
+            created_at, message_id = before
+            messages = messages.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=message_id)
+        messages = messages.order_by('-created_at', '-id')
+
+    page = list(messages[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+    if after is None:
+        page.reverse()
+    return page, has_more
+
+
+def record_latest(message):
+    """
+    Show a written message as its group's last message, unless the group
+    already shows a newer one. One UPDATE, which also moves the group's
+    updated_at, so the group list never has to look at the messages.
+    """
+    return GroupChat.objects.filter(
+        Q(last_message_at__isnull=True) | Q(last_message_at__lte=message.created_at), pk=message.group_id
+    ).update(
+        last_message_uid=message.uid,
+        last_message_sender=Subquery(User.objects.filter(pk=message.sender_id).values('username')[:1]),
+        last_message_text=message.content[:PREVIEW_LENGTH],
+        last_message_at=message.created_at,
+        updated_at=Greatest('updated_at', Value(message.created_at)),
+    )
+
+
+def count_unread(messages):
+    """
+    Add newly written messages of one group to its members' unread counts, in
+    one UPDATE: every member gets all of them except the ones they sent.
+    """
+    sent = Counter(message.sender_id for message in messages)
+    return ChatReadCursor.objects.filter(group_id=messages[0].group_id).update(
+        unread_count=F('unread_count') + len(messages) - Case(
+            *[When(user_id=sender_id, then=Value(count)) for sender_id, count in sent.items()], default=Value(0)
+        )
+    )
+
+
+def record_written(messages):
+    """Bring each group's last message and unread counts up to date with newly written messages"""
+    by_group = {}
+    for message in messages:
+        by_group.setdefault(message.group_id, []).append(message)
+    for group_messages in by_group.values():
+        record_latest(max(group_messages, key=lambda message: message.created_at))
+        count_unread(group_messages)
+
+
+def write_messages(messages):
+    """
+    Insert a batch of messages and record them on their groups, in one
+    transaction. Rows that can't be written (their group or sender is gone,
+    or a retry of one already written) are dropped individually.
+    """
+    try:
+        with transaction.atomic():
+            GroupMessage.objects.bulk_create(messages, batch_size=500)
+            record_written(messages)
+        return
+    except IntegrityError:
+        pass
+
+    written = []
+    for message in messages:
+        try:
+            with transaction.atomic():
+                message.save(force_insert=True)
+            written.append(message)
+        except IntegrityError:
+            logger.warning('Dropping chat message %s for group %s', message.uid, message.group_id)
+    with transaction.atomic():
+        record_written(written)
+
+
+class MessageWriter:
+    """The queue of acknowledged messages and the task that writes them, one per event loop"""
+
+    def __init__(self):
+        self.pending = []
+        self.ready = None
+        self.task = None
+
+    def add(self, message):
+        """Queue an unsaved GroupMessage. Call from the event loop."""
+        if self.task is None or self.task.done() or self.task.get_loop() is not asyncio.get_running_loop():
+            self.ready = asyncio.Event()
+            self.task = asyncio.ensure_future(self.run())
+        self.pending.append(message)
+        self.ready.set()
+
+    async def flush(self):
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        try:
+            await database_sync_to_async(write_messages)(batch)
+        except Exception:
+            # Nothing was written; the same messages go out with the next batch
+            logger.exception('Could not write %d chat messages', len(batch))
+            self.pending[:0] = batch
+
+    async def run(self):
+        interval = getattr(settings, 'CHAT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            # Let the interval's messages gather into one batch
+            await asyncio.sleep(interval)
+            await self.flush()
+            if self.pending:
+                self.ready.set()
+
+
+writer = MessageWriter()
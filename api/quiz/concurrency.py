@@ -0,0 +1,33 @@
+"""
+Optimistic concurrency for game state. Writes are compare-and-swap UPDATEs that
+only apply while the columns they were computed from are unchanged, so a request
+that lost a race finds out instead of overwriting the winner.
+"""
+DEFAULT_ATTEMPTS = 3
+
+
+class StaleWrite(Exception):
+    """The row changed between being read and being written"""
+
+
+def compare_and_swap(model, pk, expected, **changes):
+    """
+    UPDATE one row, only if it still has the `expected` column values.
+    Raises StaleWrite when another writer got there first.
+    """
+    if model.objects.filter(pk=pk, **expected).update(**changes) != 1:
+        raise StaleWrite(f'{model.__name__} {pk} changed since it was read')
+
+
+def with_retries(action, attempts=DEFAULT_ATTEMPTS):
+    """
+    Call `action` until it stops raising StaleWrite. Only for actions that are
+    still right after re-reading, such as passing the turn on; the last
+    StaleWrite propagates.
+    """
+    for attempt in range(attempts):
+        try:
+            return action()
+        except StaleWrite:
+            if attempt == attempts - 1:
+                raise
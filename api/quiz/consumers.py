@@ -2,17 +2,72 @@
 WebSocket consumers for real-time communication
 """
 import json
+import uuid
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.utils import timezone
+
+from . import chat, live
+from .blobs import InvalidImage, image_fields, media_base, resolve_image
+from .engine import RuleError
+from .events import spectator_group_name
+from .models import GameSession
+from .spectators import current_state, relay, to_message
+
+
+def get_scope_user_id(scope):
+    """
+    The connected user's ID, from the Django session or else from a JWT access
+    token passed as the `token` query parameter (the mobile app's auth)
+    """
+    user = scope.get('user')
+    if user is not None and user.is_authenticated:
+        return user.id
+
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    if not token:
+        return None
+
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+    try:
+        return int(AccessToken(token[0])[api_settings.USER_ID_CLAIM])
+    except (TokenError, KeyError, ValueError):
+        return None
+
+
+def get_group_member(group_id, user_id):
+    """The member's username, or None if they aren't in the group"""
+    from .models import GroupChat
+    
+    return GroupChat.members.through.objects.filter(groupchat_id=group_id, user_id=user_id).values_list(
+        'user__username', flat=True
+    ).first()
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
     """
     Consumer for handling chat messages between users
+    
+    Rooms named group_<id> are a GroupChat's conversation: only members can
+    join, and messages are stored (see quiz/chat.py). Other rooms only relay.
     """
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = f'chat_{self.room_name}'
+        self.media_base = media_base(self.scope)
+        
+        self.group_id = chat.group_room_id(self.room_name)
+        if self.group_id is not None:
+            self.user_id = get_scope_user_id(self.scope)
+            self.username = None
+            if self.user_id is not None:
+                self.username = await database_sync_to_async(get_group_member)(self.group_id, self.user_id)
+            if self.username is None:
+                await self.close()
+                return
 
         # Join room group
         await self.channel_layer.group_add(
@@ -55,11 +110,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 )
                 return
             
+            if self.group_id is not None:
+                await self.send_group_message(text_data_json)
+                return
+            
             # Handle regular chat messages
             message = text_data_json.get('message', '')
             username = text_data_json.get('username', 'Anonymous')
-            image_data = text_data_json.get('image', None)
             timestamp = text_data_json.get('timestamp', None)
+            # These rooms store nothing and anyone can join them, so nothing is written to the blob
+            # store: inline images are relayed as sent and uploaded ones by reference
+            if text_data_json.get('image_id'):
+                image = await database_sync_to_async(resolve_image)(image_id=text_data_json['image_id'])
+                image_data = image_fields(image, self.media_base)
+            else:
+                image_data = {'image_id': None, 'image': text_data_json.get('image', None), 'thumbnail': None}
             
             # Send message to room group
             await self.channel_layer.group_send(
@@ -68,7 +133,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     'type': 'chat_message',
                     'message': message,
                     'username': username,
-                    'image': image_data,
+                    **image_data,
                     'timestamp': timestamp,
                 }
             )
@@ -77,6 +142,57 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'type': 'error',
                 'message': 'Invalid JSON format'
             }))
+        except InvalidImage as e:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': str(e)
+            }))
+
+    async def send_group_message(self, data):
+        """
+        Accept a message for the group: the server assigns its ID and timestamp,
+        acknowledges it to the sender, fans it out and queues it to be stored
+        """
+        from .models import GroupMessage
+        
+        content = (data.get('message') or '').strip()
+        if not content and not data.get('image') and not data.get('image_id'):
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Message content or image is required'
+            }))
+            return
+        image = await self.get_image(data)
+        
+        message = GroupMessage(
+            uid=uuid.uuid4(),
+            group_id=self.group_id,
+            sender_id=self.user_id,
+            content=content,
+            image=image,
+            created_at=timezone.now()
+        )
+        chat.writer.add(message)
+        
+        await self.send(text_data=json.dumps({
+            'type': 'message_ack',
+            'client_id': data.get('client_id'),
+            'id': str(message.uid),
+            'timestamp': message.created_at.isoformat(),
+        }))
+        await self.channel_layer.group_send(
+            self.room_group_name, chat.message_event(message, self.username, self.media_base)
+        )
+
+    async def get_image(self, data):
+        """
+        The ChatImage a group message refers to: an `image_id` uploaded earlier,
+        or an inline base64 `image`, stored now (connect has checked membership).
+        None without one.
+        """
+        if not data.get('image') and not data.get('image_id'):
+            return None
+        return await database_sync_to_async(resolve_image)(data.get('image'), data.get('image_id'))
 
     async def chat_message(self, event):
         """
@@ -84,15 +200,17 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """
         message = event['message']
         username = event['username']
-        image = event.get('image', None)
         timestamp = event.get('timestamp', None)
 
         # Send message to WebSocket
         await self.send(text_data=json.dumps({
             'type': 'chat_message',
+            'id': event.get('id'),
             'message': message,
             'username': username,
-            'image': image,
+            'image_id': event.get('image_id'),
+            'image': event.get('image'),
+            'thumbnail': event.get('thumbnail'),
             'timestamp': timestamp,
         }))
 
@@ -115,7 +233,18 @@ class GameConsumer(AsyncWebsocketConsumer):
     """
     async def connect(self):
         self.game_id = self.scope['url_route']['kwargs']['game_id']
-        self.game_group_name = f'game_{self.game_id}'
+        self.session_id = None
+        self.live_game = None
+        self.spectating = False
+        self.participant_id = None
+        
+        # The route accepts any word; game IDs are numbers
+        try:
+            self.session_id = int(self.game_id)
+        except ValueError:
+            await self.close(code=4400)
+            return
+        self.game_group_name = f'game_{self.session_id}'
 
         # Join game group
         await self.channel_layer.group_add(
@@ -131,11 +260,20 @@ class GameConsumer(AsyncWebsocketConsumer):
         }))
 
     async def disconnect(self, close_code):
+        if self.session_id is None:
+            return
+        
         # Leave game group
         await self.channel_layer.group_discard(
             self.game_group_name,
             self.channel_name
         )
+        
+        if self.live_game is not None:
+            await live.leave(self.live_game)
+        if self.spectating:
+            await self.channel_layer.group_discard(spectator_group_name(self.session_id), self.channel_name)
+            await relay.unwatch(self.session_id)
 
     async def receive(self, text_data):
         """
@@ -143,13 +281,38 @@ class GameConsumer(AsyncWebsocketConsumer):
         """
         try:
             data = json.loads(text_data)
-            action_type = data.get('type', 'game_update')
+            action_type = data.get('type', 'client_message') if isinstance(data, dict) else None
+            if not isinstance(action_type, str):
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'message': 'Messages must be objects with a text type'
+                }))
+                return
+            
+            # Spectators only ever receive
+            if action_type == 'spectate' or self.spectating:
+                await self.spectate(action_type)
+                return
             
-            # Broadcast game update to all players in the game
+            # Real-time mode actions are applied to the in-memory game
+            if action_type.startswith('live.'):
+                await self.live_action(action_type, data)
+                return
+            
+            # Anything else is a message between the players, relayed under its own
+            # type so that it can't pass for one of the server's game events
+            sender_id = await self.get_participant_id()
+            if sender_id is None:
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'message': 'Only players can message this game'
+                }))
+                return
             await self.channel_layer.group_send(
                 self.game_group_name,
                 {
-                    'type': 'game_update',
+                    'type': 'client_message',
+                    'sender': sender_id,
                     'data': data,
                 }
             )
@@ -159,14 +322,130 @@ class GameConsumer(AsyncWebsocketConsumer):
                 'message': 'Invalid JSON format'
             }))
 
-    async def game_update(self, event):
+    async def get_participant_id(self):
+        """The connected user's ID if they play in this game, else None; checked once per connection"""
+        if self.participant_id is None:
+            user_id = get_scope_user_id(self.scope)
+            if user_id is not None and await database_sync_to_async(GameSession.has_participant)(self.session_id, user_id):
+                self.participant_id = user_id
+        return self.participant_id
+
+    async def live_action(self, action_type, data):
         """
-        Receive game update from group and send to WebSocket
+        live.join hosts the game in memory (if it isn't already) and replies with
+        its state; live.pick and live.answer then play it without HTTP round trips
         """
-        data = event['data']
+        try:
+            if self.live_game is not None and self.live_game.lost:
+                # Another host has the game now; this copy is stale
+                await live.leave(self.live_game)
+                self.live_game = None
+                if action_type != 'live.join':
+                    raise RuleError('This game moved to another server; send live.join again')
+            
+            if action_type == 'live.join':
+                if self.live_game is None:
+                    user_id = get_scope_user_id(self.scope)
+                    if user_id is None:
+                        raise RuleError('Authentication required')
+                    self.live_game = await live.join(self.session_id, user_id)
+                    self.user_id = user_id
+                await self.send(text_data=json.dumps({
+                    'type': 'live.state',
+                    **self.live_game.snapshot(),
+                }, default=str))
+                return
+            
+            if self.live_game is None:
+                raise RuleError('Send live.join first')
+            if action_type == 'live.pick':
+                game_events = self.live_game.pick(self.user_id, data.get('category'))
+                live.schedule_deadline(self.live_game)
+            elif action_type == 'live.answer':
+                game_events = self.live_game.answer(self.user_id, data.get('answer'))
+                live.schedule_progress(self.live_game)
+            else:
+                raise RuleError(f'Unknown action: {action_type}')
+        except RuleError as e:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': str(e)
+            }))
+            return
         
-        # Send update to WebSocket
-        await self.send(text_data=json.dumps(data))
+        for event, event_data in game_events:
+            await self.channel_layer.group_send(
+                self.game_group_name,
+                {'type': 'game_event', 'event': event, 'data': event_data}
+            )
+
+    async def spectate(self, action_type):
+        """
+        Turn this connection into a read-only spectator: it moves from the players'
+        group to the spectators', gets a snapshot of the game and then throttled
+        deltas (see quiz/spectators.py)
+        """
+        try:
+            if action_type != 'spectate':
+                raise RuleError('Spectators cannot send game actions')
+            if self.live_game is not None:
+                raise RuleError('Players cannot spectate their own game')
+            user_id = get_scope_user_id(self.scope)
+            if user_id is None:
+                raise RuleError('Authentication required')
+            if self.spectating:
+                snapshot = to_message(await current_state(self.session_id))
+            else:
+                # Join before the snapshot is taken, so no delta can fall in between
+                await self.channel_layer.group_discard(self.game_group_name, self.channel_name)
+                await self.channel_layer.group_add(spectator_group_name(self.session_id), self.channel_name)
+                try:
+                    snapshot = await relay.watch(self.session_id, user_id)
+                except RuleError:
+                    await self.channel_layer.group_discard(spectator_group_name(self.session_id), self.channel_name)
+                    await self.channel_layer.group_add(self.game_group_name, self.channel_name)
+                    raise
+                self.spectating = True
+        except RuleError as e:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': str(e)
+            }))
+            return
+        
+        await self.send(text_data=json.dumps({
+            'type': 'spectate.snapshot',
+            **snapshot,
+        }))
+
+    async def spectator_delta(self, event):
+        """
+        Forward a spectator delta: the parts of the snapshot that changed, with the new version
+        """
+        await self.send(text_data=json.dumps({
+            'type': 'spectate.delta',
+            **event['data'],
+        }))
+
+    async def client_message(self, event):
+        """
+        Forward a message one player sent the game, wrapped with who sent it
+        """
+        await self.send(text_data=json.dumps({
+            'type': 'client_message',
+            'sender': event['sender'],
+            'data': event['data'],
+        }))
+
+    async def game_event(self, event):
+        """
+        Forward a server-side game event (round_started, answer_progress,
+        round_completed, session_deleted) to the WebSocket
+        """
+        await self.send(text_data=json.dumps({
+            'type': event['event'],
+            **event['data'],
+        }))
 
 
 class NotificationConsumer(AsyncWebsocketConsumer):
@@ -0,0 +1,62 @@
+"""
+"My games" dashboard, built with a fixed number of queries however many games a user is in
+"""
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from .models import GameRound, GameSession, GameTurn
+
+PARTICIPANT_PREVIEW_SIZE = 6
+
+
+def _thumbnail_url(path):
+    return f'{settings.MEDIA_URL}{path}' if path else None
+
+
+def build_dashboard(user):
+    """
+    Summaries of every active session the user is in: participant previews,
+    whose turn it is, and the round (if any) still waiting on the user's answer.
+    """
+    sessions = list(
+        GameSession.objects.filter(participants=user, is_active=True)
+        .select_related('group')
+        .only('id', 'session_type', 'group__id', 'group__name', 'current_turn_user_id', 'version', 'created_at', 'updated_at')
+    )
+    session_ids = [session.id for session in sessions]
+
+    participants = {session_id: [] for session_id in session_ids}
+    Participant = GameSession.participants.through
+    rows = Participant.objects.filter(gamesession_id__in=session_ids).order_by('id').values_list(
+        'gamesession_id', 'user_id', 'user__username', 'user__thumbnail'
+    )
+    for session_id, user_id, username, thumbnail in rows:
+        participants[session_id].append({'id': user_id, 'username': username, 'thumbnail': _thumbnail_url(thumbnail)})
+
+    # Open rounds the user hasn't answered; large rooms have no answer slot until the player answers
+    answered = GameTurn.objects.filter(round=OuterRef('pk'), player=user, answered_at__isnull=False)
+    pending_rounds = dict(
+        GameRound.objects.filter(session_id__in=session_ids, is_completed=False)
+        .filter(~Exists(answered))
+        .order_by('created_at')
+        .values_list('session_id', 'id')
+    )
+
+    dashboard = []
+    for session in sessions:
+        players = participants[session.id]
+        current_turn = next((p for p in players if p['id'] == session.current_turn_user_id), None)
+        dashboard.append({
+            'id': session.id,
+            'session_type': session.session_type,
+            'group': {'id': session.group.id, 'name': session.group.name} if session.group else None,
+            'participant_count': len(players),
+            'participants': players[:PARTICIPANT_PREVIEW_SIZE],
+            'current_turn_user': current_turn,
+            'is_my_turn': session.current_turn_user_id == user.id,
+            'pending_round_id': pending_rounds.get(session.id),
+            'version': session.version,
+            'created_at': session.created_at,
+            'updated_at': session.updated_at,
+        })
+    return dashboard
@@ -0,0 +1,52 @@
+"""
+Shuffled question decks so picking a question never rescans a whole category
+"""
+import random
+
+from .catalog import get_catalog
+from .engine import draw
+from .models import Question
+
+
+def build_decks(exclude_ids=()):
+    """Build a shuffled deck of question IDs for every category from the cached catalog"""
+    excluded = set(exclude_ids)
+    decks = {}
+    for category, question_ids in get_catalog().category_ids.items():
+        deck = [question_id for question_id in question_ids if question_id not in excluded]
+        random.shuffle(deck)
+        decks[category] = deck
+    return decks
+
+
+def add_missing_decks(session):
+    """Build decks for categories the session has none for, leaving out anything already asked"""
+    decks = session.question_decks
+    asked_ids = session.rounds.values_list('question_id', flat=True)
+    decks.update({
+        category: deck for category, deck in build_decks(asked_ids).items() if category not in decks
+    })
+
+
+def draw_question(session, category):
+    """
+    Pop the next question in a category off the session's deck.
+    Returns None once every question in the category has been asked.
+    The caller saves question_decks along with the rest of its write.
+    """
+    decks = session.question_decks
+    if category not in decks:
+        # Sessions created before decks existed build theirs on the first pick
+        add_missing_decks(session)
+        decks.setdefault(category, [])
+
+    # A question may have been deleted since the deck was shuffled
+    return draw(decks[category], lambda question_id: Question.objects.filter(pk=question_id).first())
+
+
+def pick_random_question(questions):
+    """Choose a random question from a queryset by loading only IDs, then fetching one row"""
+    question_ids = list(questions.order_by().values_list('id', flat=True))
+    if not question_ids:
+        return None
+    return questions.get(pk=random.choice(question_ids))
@@ -0,0 +1,190 @@
+"""
+The game's rules on plain data.
+
+Nothing here touches the ORM, the channel layer or settings. The HTTP views,
+the real-time LiveGame and the bench_engine simulation all hand it player IDs,
+answers and questions (anything with `id`, `category` and `points`) and apply
+what it decides.
+"""
+from .matching import DEFAULT_STRATEGY, get_matcher
+
+MAX_ROUNDS_PER_PLAYER = 3
+
+
+class RuleError(Exception):
+    """An action the rules don't allow; the message is meant for the player"""
+
+
+class NotYourTurn(RuleError):
+    pass
+
+
+def next_turn(turn_order, turn_index):
+    """The turn after `turn_index` as (turn_index, user_id); unchanged when nobody is in the order"""
+    if not turn_order:
+        return turn_index, None
+    turn_index = (turn_index + 1) % len(turn_order)
+    return turn_index, turn_order[turn_index]
+
+
+def check_pick(player_id, current_turn_user_id, category, round_open=False):
+    """Raise RuleError unless `player_id` may pick `category` now"""
+    if round_open:
+        raise RuleError('The current round has not finished yet')
+    if player_id != current_turn_user_id:
+        raise NotYourTurn('Not your turn')
+    if not category or not isinstance(category, str):
+        raise RuleError('Category is required')
+
+
+def next_picker(player_ids, picker_id):
+    """The player after `picker_id`, starting from the first when the picker isn't playing"""
+    index = player_ids.index(picker_id) if picker_id in player_ids else -1
+    return player_ids[(index + 1) % len(player_ids)]
+
+
+def is_game_over(rounds_played, player_count, max_rounds=MAX_ROUNDS_PER_PLAYER):
+    """Games end once every player has picked `max_rounds` times"""
+    return rounds_played >= max_rounds * player_count
+
+
+def draw(deck, lookup):
+    """
+    Pop question IDs off the end of a deck until `lookup` finds one that still
+    exists. Returns what `lookup` returned, or None once the deck runs out.
+    """
+    while deck:
+        question = lookup(deck.pop())
+        if question is not None:
+            return question
+    return None
+
+
+def compute_points(picker_id, picker_answer, points, answers, strategy=DEFAULT_STRATEGY):
+    """
+    Work out every player's points for a round.
+
+    `answers` is an iterable of (player_id, answer) pairs. The picker earns the
+    question's points for answering; everyone else earns them when the matching
+    strategy says their answer matches the picker's. Missing answers (None) score
+    zero. Returns {player_id: points}.
+    """
+    matcher = get_matcher(strategy, picker_answer) if picker_answer else None
+    awarded = {}
+    for player_id, answer in answers:
+        if player_id == picker_id:
+            awarded[player_id] = points if answer else 0
+        elif matcher and answer and matcher.matches(answer):
+            awarded[player_id] = points
+        else:
+            awarded[player_id] = 0
+    return awarded
+
+
+class Round:
+    """One question put to every player; an answer of None means the player hasn't answered"""
+
+    def __init__(self, question, picker_id, player_ids, answers=None, picker_answer=None):
+        self.question = question
+        self.picker_id = picker_id
+        self.picker_answer = picker_answer
+        self.answers = answers if answers is not None else dict.fromkeys(player_ids)
+        self.answered_count = sum(1 for answer in self.answers.values() if answer is not None)
+        self.points = {}
+        self.is_completed = False
+
+    @property
+    def is_full(self):
+        return self.answered_count >= len(self.answers)
+
+    def answer(self, player_id, answer):
+        """Record an answer, replacing any earlier one. Returns True for the player's first answer."""
+        if player_id not in self.answers:
+            raise RuleError('You are not playing in this round')
+        if not answer:
+            raise RuleError('Answer is required')
+        if not isinstance(answer, str):
+            raise RuleError('Answer must be text')
+
+        first_answer = self.answers[player_id] is None
+        self.answers[player_id] = answer
+        if first_answer:
+            self.answered_count += 1
+        if player_id == self.picker_id:
+            self.picker_answer = answer
+        return first_answer
+
+    def score(self, strategy=DEFAULT_STRATEGY):
+        # Completed only once scored, so a failure leaves the round open
+        self.points = compute_points(
+            self.picker_id, self.picker_answer, self.question.points, self.answers.items(), strategy
+        )
+        self.is_completed = True
+        return self.points
+
+
+class Game:
+    """
+    A session's rules state: who plays, whose turn it is, what is left in each
+    category's deck, the scores and the round being played.
+
+    `questions` maps question IDs to questions and `strategy_for` picks the
+    matching strategy for a question.
+    """
+
+    round_class = Round
+
+    def __init__(self, player_ids, turn_order, questions, decks, turn_index=0, current_turn_user_id=None,
+                 scores=None, current_round=None, strategy_for=None):
+        self.player_ids = list(player_ids)
+        self.turn_order = list(turn_order)
+        self.turn_index = turn_index
+        self.current_turn_user_id = current_turn_user_id
+        self.questions = questions
+        self.decks = decks
+        self.scores = scores if scores is not None else dict.fromkeys(self.player_ids, 0)
+        self.current_round = current_round
+        self.strategy_for = strategy_for or (lambda question: DEFAULT_STRATEGY)
+
+    def pick(self, player_id, category):
+        """The current player picks a category, starting a round with the next question from its deck"""
+        round_open = self.current_round is not None and not self.current_round.is_completed
+        check_pick(player_id, self.current_turn_user_id, category, round_open)
+
+        question = draw(self.decks.get(category, []), self.questions.get)
+        if question is None:
+            raise RuleError('No more questions in this category')
+
+        self.current_round = self.round_class(question, player_id, self.player_ids)
+        return self.current_round
+
+    def answer(self, player_id, answer):
+        """
+        Record a player's answer, scoring the round once everyone has answered.
+        Returns (first_answer, points awarded or None while the round is open).
+        """
+        round_ = self.current_round
+        if round_ is None or round_.is_completed:
+            raise RuleError('No round in progress')
+
+        first_answer = round_.answer(player_id, answer)
+        if not round_.is_full:
+            return first_answer, None
+        return first_answer, self.complete_round(round_)
+
+    def expire_round(self):
+        """Close the current round at its deadline; anyone who hasn't answered scores zero"""
+        round_ = self.current_round
+        if round_ is None or round_.is_completed:
+            raise RuleError('No round in progress')
+        return self.complete_round(round_)
+
+    def complete_round(self, round_):
+        """Score the round, add the points to the totals and pass the turn on"""
+        awarded = round_.score(self.strategy_for(round_.question))
+        for player_id, points in awarded.items():
+            if points:
+                self.scores[player_id] = self.scores.get(player_id, 0) + points
+        if self.turn_order:
+            self.turn_index, self.current_turn_user_id = next_turn(self.turn_order, self.turn_index)
+        return awarded
@@ -0,0 +1,92 @@
+"""
+Typed game events pushed to everyone connected to a game's socket group
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+def game_group_name(session_id):
+    return f'game_{session_id}'
+
+
+def spectator_group_name(session_id):
+    return f'game_{session_id}_spectators'
+
+
+def publish(session_id, event, /, spectators=False, **data):
+    """
+    Send an event to the game's group once the current transaction commits,
+    so clients never hear about state that was rolled back. Spectators are
+    sent deltas by quiz/spectators.py instead, unless `spectators` is set.
+    """
+    message = {'type': 'game_event', 'event': event, 'data': data}
+
+    def send():
+        channel_layer = get_channel_layer()
+        if channel_layer is not None:
+            async_to_sync(channel_layer.group_send)(game_group_name(session_id), message)
+            if spectators:
+                async_to_sync(channel_layer.group_send)(spectator_group_name(session_id), message)
+
+    transaction.on_commit(send)
+
+
+def question_payload(question):
+    return {
+        'id': question.id,
+        'category': question.category,
+        'question_number': question.question_number,
+        'question_text': question.question_text,
+        'points': question.points,
+        'consequence': question.consequence,
+    }
+
+
+def round_started(round_obj):
+    publish(
+        round_obj.session_id, 'round_started',
+        round_id=round_obj.id,
+        picker_id=round_obj.picker_id,
+        question=question_payload(round_obj.question),
+        total_players=round_obj.player_count,
+        deadline=round_obj.deadline.isoformat() if round_obj.deadline else None,
+    )
+
+
+def answer_progress(round_obj, player_id, answered_count, total_players):
+    publish(
+        round_obj.session_id, 'answer_progress',
+        round_id=round_obj.id,
+        player_id=player_id,
+        answered_count=answered_count,
+        total_players=total_players,
+    )
+
+
+def round_progress(round_obj, answered_count, total_players):
+    """A large room's answer tally, sent periodically in place of answer_progress"""
+    publish(
+        round_obj.session_id, 'round_progress',
+        round_id=round_obj.id,
+        answered_count=answered_count,
+        total_players=total_players,
+    )
+
+
+def round_completed(round_obj, picker_answer, points_by_player, next_turn_user_id, timed_out=False):
+    publish(
+        round_obj.session_id, 'round_completed',
+        round_id=round_obj.id,
+        picker_answer=picker_answer,
+        score_deltas=[
+            {'player_id': player_id, 'points': points}
+            for player_id, points in points_by_player.items()
+        ],
+        next_turn_user_id=next_turn_user_id,
+        timed_out=timed_out,
+    )
+
+
+def session_deleted(session_id):
+    publish(session_id, 'session_deleted', spectators=True, session_id=session_id)
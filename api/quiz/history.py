@@ -0,0 +1,115 @@
+"""
+Append-only history of every game. Each thing that happens (a session created,
+a category picked, an answer given, a round scored, the turn moving on) is one
+small GameEvent row, written in the same transaction as the change it records.
+
+Rounds and turns hold only where a game ended up; the history says how it got
+there. Reading it back is one sequential scan of an index, so audits, analytics
+and replays don't need to join the game tables, and folding it rebuilds the
+game's rules state (see `fold`).
+"""
+from types import SimpleNamespace
+
+from . import engine
+from .models import GameEvent
+
+CREATED = 'created'
+PICKED = 'picked'
+ANSWERED = 'answered'
+SCORED = 'scored'
+TURN = 'turn'
+
+
+def event(session_id, kind, **data):
+    """An unsaved event, for writing several with one bulk_create"""
+    return GameEvent(session_id=session_id, kind=kind, data=data)
+
+
+def record(session_id, kind, **data):
+    return GameEvent.objects.create(session_id=session_id, kind=kind, data=data)
+
+
+def created(session):
+    record(
+        session.id, CREATED,
+        players=list(session.turn_order),
+        turn_order=session.turn_order,
+        turn=session.current_turn_user_id,
+    )
+
+
+def picked(round_obj):
+    question = round_obj.question
+    record(
+        round_obj.session_id, PICKED,
+        round=round_obj.id,
+        picker=round_obj.picker_id,
+        question=question.id,
+        category=question.category,
+        points=question.points,
+    )
+
+
+def answered(round_obj, player_id, answer):
+    record(round_obj.session_id, ANSWERED, round=round_obj.id, player=player_id, answer=answer)
+
+
+def round_ended(round_obj, points_by_player, session, timed_out=False):
+    """A round's points and the turn they passed to, in one write"""
+    GameEvent.objects.bulk_create([
+        event(
+            session.id, SCORED,
+            round=round_obj.id,
+            points=list(points_by_player.items()),
+            timed_out=timed_out,
+        ),
+        event(session.id, TURN, index=session.turn_index, user=session.current_turn_user_id),
+    ])
+
+
+def fold(events):
+    """
+    Rebuild a game's rules state from its (kind, data) events, in order: players,
+    turn, scores and the last round with its answers. Returns an engine.Game, or
+    None when the history doesn't start with the session's creation.
+
+    Question decks aren't part of the history; the session row keeps them.
+    """
+    game = None
+    rounds = {}
+    for kind, data in events:
+        if kind == CREATED:
+            game = engine.Game(data['players'], data['turn_order'], {}, {}, current_turn_user_id=data['turn'])
+        elif game is None:
+            return None
+        elif kind == PICKED:
+            question = SimpleNamespace(id=data['question'], category=data['category'], points=data['points'])
+            game.current_round = rounds[data['round']] = engine.Round(question, data['picker'], game.player_ids)
+        elif kind == ANSWERED:
+            # An answer belongs to the round it names; one recorded after that round
+            # was scored didn't count towards it
+            round_ = rounds.get(data['round'])
+            if round_ is not None and not round_.is_completed:
+                round_.answer(data['player'], data['answer'])
+        elif kind == SCORED:
+            round_ = rounds[data['round']]
+            round_.is_completed = True
+            round_.points = dict(data['points'])
+            for player_id, points in round_.points.items():
+                game.scores[player_id] = game.scores.get(player_id, 0) + points
+        elif kind == TURN:
+            game.turn_index, game.current_turn_user_id = data['index'], data['user']
+    return game
+
+
+def replay(session_id):
+    """A session's events as (id, kind, data, created_at), oldest first, read in chunks"""
+    return (
+        GameEvent.objects.filter(session_id=session_id).order_by('id')
+        .values_list('id', 'kind', 'data', 'created_at').iterator(chunk_size=500)
+    )
+
+
+def rebuild(session_id):
+    """The session's rules state, folded from its history"""
+    return fold((kind, data) for _, kind, data, _ in replay(session_id))
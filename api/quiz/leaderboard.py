@@ -0,0 +1,86 @@
+"""
+Cross-game leaderboards. PlayerStats totals are kept current as rounds complete;
+ranks are rematerialized in bulk by the rebuild_leaderboard command, so the
+leaderboard endpoints are small indexed reads however many players there are.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .models import FriendLeaderboardEntry, FriendRequest, LeaderboardEntry, PlayerStats
+
+BATCH_SIZE = 1000
+
+
+def _ranked(totals):
+    """Competition ranks (1, 2, 2, 4) for (user_id, points) pairs, highest points first"""
+    ordered = sorted(totals, key=lambda item: (-item[1], item[0]))
+    rank = 0
+    previous = None
+    for position, (user_id, points) in enumerate(ordered, 1):
+        if points != previous:
+            rank, previous = position, points
+        yield user_id, rank, points
+
+
+def friend_ids_by_user():
+    """Every user's friends from accepted requests, in either direction, read with one query"""
+    friends = {}
+    edges = FriendRequest.objects.filter(status='accepted').values_list('from_user_id', 'to_user_id')
+    for from_user_id, to_user_id in edges.iterator():
+        friends.setdefault(from_user_id, set()).add(to_user_id)
+        friends.setdefault(to_user_id, set()).add(from_user_id)
+    return friends
+
+
+def rebuild_leaderboards():
+    """Rematerialize the global and friends boards from PlayerStats. Returns the row counts."""
+    totals = dict(PlayerStats.objects.values_list('user_id', 'total_points'))
+    global_entries = [
+        LeaderboardEntry(user_id=user_id, rank=rank, total_points=points)
+        for user_id, rank, points in _ranked(totals.items())
+    ]
+
+    friend_entries = []
+    for owner_id, friend_ids in friend_ids_by_user().items():
+        circle = ((player_id, totals.get(player_id, 0)) for player_id in friend_ids | {owner_id})
+        friend_entries.extend(
+            FriendLeaderboardEntry(owner_id=owner_id, player_id=player_id, rank=rank, total_points=points)
+            for player_id, rank, points in _ranked(circle)
+        )
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(global_entries, batch_size=BATCH_SIZE)
+        FriendLeaderboardEntry.objects.all().delete()
+        FriendLeaderboardEntry.objects.bulk_create(friend_entries, batch_size=BATCH_SIZE)
+    return len(global_entries), len(friend_entries)
+
+
+def _entry(rank, total_points, user_id, username, thumbnail):
+    return {
+        'rank': rank,
+        'total_points': total_points,
+        'user': {
+            'id': user_id,
+            'username': username,
+            'thumbnail': f'{settings.MEDIA_URL}{thumbnail}' if thumbnail else None,
+        },
+    }
+
+
+def global_top(limit):
+    rows = LeaderboardEntry.objects.order_by('rank')[:limit].values_list(
+        'rank', 'total_points', 'user_id', 'user__username', 'user__thumbnail'
+    )
+    return [_entry(*row) for row in rows]
+
+
+def friends_board(user):
+    rows = FriendLeaderboardEntry.objects.filter(owner=user).order_by('rank').values_list(
+        'rank', 'total_points', 'player_id', 'player__username', 'player__thumbnail'
+    )
+    return [_entry(*row) for row in rows]
+
+
+def my_global_entry(user):
+    return LeaderboardEntry.objects.filter(user=user).values('rank', 'total_points').first()
@@ -0,0 +1,547 @@
+"""
+Real-time games: a live session's state is held in memory by the process
+hosting its socket group, actions from the GameConsumer are applied there, and a
+write-behind flusher persists the changes to the usual models in batches.
+
+Every in-memory change is stamped with the session version it produced, so a
+flush is simply "everything changed since the last flushed version". A flush that
+fails leaves the watermark where it was and is retried on the next tick.
+
+A process hosts a game by claiming it with a lease (live_host, live_until) that
+every flush renews. If the host dies the lease lapses, and the game goes back to
+HTTP play and the deadline sweep, or to whichever process claims it next. A host
+that finds its claim gone stops hosting rather than overwrite the new owner.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import timedelta
+from functools import partial
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import engine, history
+from .catalog import get_catalog
+from .decks import add_missing_decks
+from .events import game_group_name, question_payload
+from .matching import strategy_for
+from .models import GameEvent, GameRound, GameScore, GameSession, GameTurn, PlayerStats
+from .timers import PROGRESS_INTERVAL, round_deadline, round_timers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 0.25  # Seconds between write-behind flushes
+LEASE = 30  # Seconds a host holds a game without renewing; renewed at least every LEASE / 3
+HOST = uuid.uuid4().hex  # This process, as recorded on the games it hosts
+
+ROUND_FIELDS = ['picker_answer', 'answered_count', 'is_completed', 'version']
+TURN_FIELDS = ['answer', 'answered_at', 'points_earned', 'version']
+
+
+class LostGame(Exception):
+    """This process no longer holds the game: another host claimed it after our lease lapsed, or it was deleted"""
+
+
+def lease_expiry():
+    return timezone.now() + timedelta(seconds=LEASE)
+
+
+class LiveRound(engine.Round):
+    """An engine round plus what the flusher needs: row ID, answer times and change versions"""
+
+    def __init__(self, question, picker_id, player_ids, version=0, answers=None, picker_answer=None,
+                 db_id=None, answered_at=None, turn_versions=None, deadline=None):
+        super().__init__(question, picker_id, player_ids, answers, picker_answer)
+        self.db_id = db_id  # Assigned once the round has been flushed
+        self.answered_at = answered_at or {}  # Player ID -> first answer time
+        self.turn_versions = turn_versions or dict.fromkeys(self.answers, version)
+        self.version = version
+        self.deadline = deadline
+
+    def to_dict(self):
+        return {
+            'round_id': self.db_id,
+            'picker_id': self.picker_id,
+            'question': question_payload(self.question),
+            'answered_player_ids': list(self.answered_at),
+            'total_players': len(self.answers),
+            'is_completed': self.is_completed,
+            'deadline': self.deadline.isoformat() if self.deadline else None,
+        }
+
+
+class LiveGame(engine.Game):
+    """
+    The authoritative state of one live session. The engine applies the rules;
+    this class stamps each change with a version for the flusher and turns the
+    outcome into the events to broadcast, as (event, data) pairs. Nothing here
+    touches the database, so actions run straight on the event loop.
+    """
+
+    def __init__(self, session_id, version, catalog, large=False, **state):
+        super().__init__(questions=catalog.questions, strategy_for=strategy_for, **state)
+        self.session_id = session_id
+        self.large = large  # Large room: no per-answer events, slots written only for answers
+
+        self.version = version
+        self.flushed_version = version
+        self.session_changed_at = version  # Version of the last change to turn or decks
+        self.score_changed_at = {}  # Player ID -> version of their last score change
+        self.unflushed_rounds = [self.current_round] if self.current_round else []
+        self.log = []  # (kind, data, round) history entries not yet flushed
+
+        self.connections = 0
+        self.closing = asyncio.Event()
+        self.flusher = None
+        self.renewed_at = time.monotonic()  # Last time the lease was extended
+        self.lost = False  # Set once another host has the game; this copy is then dead
+
+    round_class = LiveRound
+
+    def _bump(self):
+        self.version += 1
+        return self.version
+
+    def snapshot(self):
+        return {
+            'session_id': self.session_id,
+            'version': self.version,
+            'turn_order': self.turn_order,
+            'current_turn_user_id': self.current_turn_user_id,
+            'scores': [{'player_id': player_id, 'points': points} for player_id, points in self.scores.items()],
+            'current_round': self.current_round.to_dict() if self.current_round else None,
+        }
+
+    def pick(self, player_id, category):
+        round_ = super().pick(player_id, category)
+        version = self._bump()
+        round_.version = version
+        round_.turn_versions = dict.fromkeys(round_.answers, version)
+        round_.deadline = round_deadline()
+        self.session_changed_at = version
+        self.unflushed_rounds.append(round_)
+        self.log.append((history.PICKED, {
+            'picker': player_id,
+            'question': round_.question.id,
+            'category': round_.question.category,
+            'points': round_.question.points,
+        }, round_))
+
+        return [('round_started', {
+            'round_id': None,
+            'picker_id': player_id,
+            'question': question_payload(round_.question),
+            'total_players': len(round_.answers),
+            'deadline': round_.deadline.isoformat() if round_.deadline else None,
+            'version': version,
+        })]
+
+    def answer(self, player_id, answer):
+        first_answer, awarded = super().answer(player_id, answer)
+        round_ = self.current_round
+
+        version = self._bump()
+        round_.version = version
+        round_.turn_versions[player_id] = version
+        if first_answer:
+            round_.answered_at[player_id] = timezone.now()
+        self.log.append((history.ANSWERED, {'player': player_id, 'answer': answer}, round_))
+
+        events = []
+        if first_answer and not self.large:
+            events.append(('answer_progress', {
+                'round_id': round_.db_id,
+                'player_id': player_id,
+                'answered_count': round_.answered_count,
+                'total_players': len(round_.answers),
+                'version': version,
+            }))
+        if awarded is not None:
+            events.append(self._round_completed(round_, awarded, version))
+        return events
+
+    def expire_round(self):
+        """Close the current round at its deadline; returns the events to broadcast"""
+        awarded = super().expire_round()
+        round_ = self.current_round
+        version = self._bump()
+        round_.version = version
+        return [self._round_completed(round_, awarded, version, timed_out=True)]
+
+    def _round_completed(self, round_, awarded, version, timed_out=False):
+        if self.large:
+            # Like the HTTP game, a large room only scores the players who answered
+            awarded = round_.points = {
+                player_id: points for player_id, points in awarded.items() if round_.answers[player_id] is not None
+            }
+        for scored_id, points in awarded.items():
+            if points:
+                round_.turn_versions[scored_id] = version
+                self.score_changed_at[scored_id] = version
+        self.session_changed_at = version
+        self.log.append((history.SCORED, {'points': list(awarded.items()), 'timed_out': timed_out}, round_))
+        self.log.append((history.TURN, {'index': self.turn_index, 'user': self.current_turn_user_id}, None))
+        return ('round_completed', {
+            'round_id': round_.db_id,
+            'picker_answer': round_.picker_answer,
+            'score_deltas': [{'player_id': scored_id, 'points': points} for scored_id, points in awarded.items()],
+            'next_turn_user_id': self.current_turn_user_id,
+            'timed_out': timed_out,
+            'version': version,
+        })
+
+    def take_changes(self):
+        """
+        Copy out everything changed since the last flush as plain data, so the
+        flush can run in a worker thread while actions keep being applied here.
+        Returns the rounds included alongside the data, or (None, None).
+
+        History entries name their round by ID, or for rounds not yet written by
+        position in the changes' rounds, which persist turns into the new ID.
+        """
+        since = self.flushed_version
+        if self.version == since:
+            return None, None
+
+        rounds = [r for r in self.unflushed_rounds if r.version > since or r.db_id is None]
+        round_data = []
+        for round_ in rounds:
+            round_data.append({
+                'db_id': round_.db_id,
+                'question_id': round_.question.id,
+                'picker_id': round_.picker_id,
+                'picker_answer': round_.picker_answer,
+                'player_count': len(round_.answers),
+                'answered_count': round_.answered_count,
+                'is_completed': round_.is_completed,
+                'version': round_.version,
+                'deadline': round_.deadline,
+                'points': dict(round_.points) if round_.is_completed else None,
+                # New rounds need every slot (large rooms only answered ones), existing ones only what changed
+                'turns': {
+                    player_id: (
+                        answer,
+                        round_.answered_at.get(player_id),
+                        round_.points.get(player_id, 0),
+                        round_.turn_versions[player_id],
+                    )
+                    for player_id, answer in round_.answers.items()
+                    if (round_.db_id is None or round_.turn_versions[player_id] > since)
+                    and not (self.large and answer is None)
+                },
+            })
+
+        history_data = []
+        for kind, data, round_ in self.log:
+            round_id = round_.db_id if round_ is not None else None
+            position = rounds.index(round_) if round_ is not None and round_id is None else None
+            history_data.append((kind, data, round_id, position))
+
+        return rounds, {
+            'version': self.version,
+            'session': {
+                'turn_index': self.turn_index,
+                'current_turn_user_id': self.current_turn_user_id,
+                'question_decks': {category: list(deck) for category, deck in self.decks.items()},
+            } if self.session_changed_at > since else None,
+            'rounds': round_data,
+            'history': history_data,
+            'scores': {
+                player_id: self.scores[player_id]
+                for player_id, changed_at in self.score_changed_at.items()
+                if changed_at > since
+            },
+        }
+
+    def mark_flushed(self, rounds, changes, round_ids, catalog):
+        """Record a successful flush: new rounds get their IDs and the watermark moves up"""
+        for round_, round_id in zip(rounds, round_ids):
+            round_.db_id = round_id
+        self.flushed_version = changes['version']
+        del self.log[:len(changes['history'])]
+        self.questions = catalog.questions
+        self.unflushed_rounds = [
+            r for r in self.unflushed_rounds
+            if r is self.current_round or r.version > self.flushed_version
+        ]
+
+
+def load_game(session_id):
+    """
+    Claim a session for this process and load it into memory. Marking it live
+    makes the HTTP game actions stand aside; the claim fails while another
+    host's lease is current.
+    """
+    claimed = GameSession.objects.filter(GameSession.unhosted(), pk=session_id).update(
+        is_live=True, live_host=HOST, live_until=lease_expiry()
+    )
+    session = GameSession.objects.get(pk=session_id)
+    if not claimed:
+        raise engine.RuleError('This game is being hosted by another server; try again shortly')
+
+    catalog = get_catalog()
+    if any(category not in session.question_decks for category in catalog.category_ids):
+        add_missing_decks(session)
+
+    player_ids = list(session.participants.values_list('id', flat=True))
+    current_round = None
+    round_obj = (
+        session.rounds.filter(is_completed=False).select_related('question').order_by('-created_at').first()
+    )
+    if round_obj is not None:
+        # From now on the live game times the round out (see schedule_deadline)
+        round_timers.cancel_round(round_obj.id)
+        turns = list(round_obj.answers.all())
+        # Large rooms may not have a slot for everyone yet
+        current_round = LiveRound(
+            round_obj.question, round_obj.picker_id, player_ids, round_obj.version,
+            answers={
+                **dict.fromkeys(player_ids),
+                **{turn.player_id: turn.answer if turn.answered_at else None for turn in turns},
+            },
+            picker_answer=round_obj.picker_answer,
+            db_id=round_obj.id,
+            answered_at={turn.player_id: turn.answered_at for turn in turns if turn.answered_at},
+            turn_versions={**dict.fromkeys(player_ids, 0), **{turn.player_id: turn.version for turn in turns}},
+            deadline=round_obj.deadline,
+        )
+
+    return LiveGame(
+        session_id=session.id,
+        version=session.version,
+        catalog=catalog,
+        large=session.mode == 'large',
+        player_ids=player_ids,
+        turn_order=session.turn_order,
+        turn_index=session.turn_index,
+        current_turn_user_id=session.current_turn_user_id,
+        decks=session.question_decks,
+        scores=dict(GameScore.objects.filter(session=session).values_list('player_id', 'points')),
+        current_round=current_round,
+    )
+
+
+def persist(session_id, changes, release=False):
+    """
+    Write one batch of changes in a single transaction: new rounds with all their
+    slots, bulk updates for everything else. Returns the IDs of the rounds written
+    (in order) and a fresh catalog for the next draws.
+    """
+    round_ids = []
+    with transaction.atomic():
+        if changes is not None:
+            new_turns = []
+            changed_rounds = []
+            turn_changes = {}
+            for data in changes['rounds']:
+                fields = {field: data[field] for field in ROUND_FIELDS}
+                if data['db_id'] is None:
+                    round_obj = GameRound.objects.create(
+                        session_id=session_id,
+                        question_id=data['question_id'],
+                        picker_id=data['picker_id'],
+                        player_count=data['player_count'],
+                        deadline=data['deadline'],
+                        **fields
+                    )
+                    new_turns.extend(
+                        GameTurn(
+                            round=round_obj, player_id=player_id, answer=answer,
+                            answered_at=answered_at, points_earned=points, version=version
+                        )
+                        for player_id, (answer, answered_at, points, version) in data['turns'].items()
+                    )
+                else:
+                    round_obj = GameRound(id=data['db_id'], **fields)
+                    changed_rounds.append(round_obj)
+                    turn_changes[round_obj.id] = dict(data['turns'])
+                round_ids.append(round_obj.id)
+                if data['points'] is not None:
+                    PlayerStats.record_round(data['points'])
+
+            GameTurn.objects.bulk_create(new_turns)
+            GameRound.objects.bulk_update(changed_rounds, ROUND_FIELDS)
+
+            entries = []
+            for kind, data, round_id, position in changes['history']:
+                if position is not None:
+                    round_id = round_ids[position]
+                if round_id is not None:
+                    data = {'round': round_id, **data}
+                entries.append(history.event(session_id, kind, **data))
+            GameEvent.objects.bulk_create(entries)
+
+            changed_turns = []
+            if turn_changes:
+                for turn in GameTurn.objects.filter(round_id__in=turn_changes).only('id', 'round_id', 'player_id'):
+                    values = turn_changes[turn.round_id].pop(turn.player_id, None)
+                    if values:
+                        turn.answer, turn.answered_at, turn.points_earned, turn.version = values
+                        changed_turns.append(turn)
+            GameTurn.objects.bulk_update(changed_turns, TURN_FIELDS)
+
+            # Large rooms' slots that don't exist yet
+            GameTurn.objects.bulk_create([
+                GameTurn(
+                    round_id=round_id, player_id=player_id, answer=answer,
+                    answered_at=answered_at, points_earned=points, version=version
+                )
+                for round_id, turns in turn_changes.items()
+                for player_id, (answer, answered_at, points, version) in turns.items()
+            ])
+
+            scores = changes['scores']
+            if scores:
+                rows = list(GameScore.objects.filter(session_id=session_id, player_id__in=scores))
+                for row in rows:
+                    row.points = scores[row.player_id]
+                GameScore.objects.bulk_update(rows, ['points'])
+                existing = {row.player_id for row in rows}
+                GameScore.objects.bulk_create([
+                    GameScore(session_id=session_id, player_id=player_id, points=points)
+                    for player_id, points in scores.items() if player_id not in existing
+                ])
+
+        session_fields = {'live_until': lease_expiry()}
+        if changes is not None:
+            session_fields['version'] = changes['version']
+            session_fields.update(changes['session'] or {})
+        if release:
+            session_fields.update(is_live=False, live_host='', live_until=None)
+        # Only the holder of the claim writes; for anyone else the whole batch rolls back
+        if not GameSession.objects.filter(pk=session_id, is_live=True, live_host=HOST).update(**session_fields):
+            raise LostGame(session_id)
+
+    return round_ids, get_catalog()
+
+
+async def flush(game, release=False):
+    rounds, changes = game.take_changes()
+    if changes is None and not release and time.monotonic() - game.renewed_at < LEASE / 3:
+        return
+    renewing_at = time.monotonic()
+    try:
+        round_ids, catalog = await database_sync_to_async(persist)(game.session_id, changes, release)
+    except LostGame:
+        logger.warning('Live game %s was claimed by another host or deleted; no longer hosting it', game.session_id)
+        game.lost = True
+        if _games.get(game.session_id) is game:
+            del _games[game.session_id]
+        return
+    except Exception:
+        # Nothing was written; the same changes go out with the next flush
+        logger.exception('Could not persist live game %s', game.session_id)
+        return
+    game.renewed_at = renewing_at
+    if changes is not None:
+        game.mark_flushed(rounds, changes, round_ids, catalog)
+
+
+async def _flush_periodically(game):
+    interval = getattr(settings, 'LIVE_GAME_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+    while True:
+        try:
+            await asyncio.wait_for(game.closing.wait(), interval)
+        except asyncio.TimeoutError:
+            await flush(game)
+            if game.lost:
+                return
+        else:
+            # Last player left: write everything out and hand the game back to HTTP
+            await flush(game, release=True)
+            return
+
+
+# Games hosted by this process
+_games = {}
+_loading = {}
+
+
+async def _host(session_id):
+    game = await database_sync_to_async(load_game)(session_id)
+    game.flusher = asyncio.ensure_future(_flush_periodically(game))
+    _games[session_id] = game
+    schedule_deadline(game)
+    return game
+
+
+def schedule_deadline(game):
+    """Time out the game's open round at its deadline, replacing any earlier timer for the game"""
+    round_ = game.current_round
+    if round_ is None or round_.is_completed or round_.deadline is None:
+        return
+    round_timers.ensure_started()
+    delay = (round_.deadline - timezone.now()).total_seconds()
+    round_timers.schedule(('live', game.session_id), delay, partial(_expire, game, round_))
+
+
+async def _expire(game, round_):
+    # The round may have finished, or the game moved to another host, while the timer waited
+    if _games.get(game.session_id) is not game or game.current_round is not round_ or round_.is_completed:
+        return
+    await _broadcast(game, game.expire_round())
+
+
+def schedule_progress(game):
+    """In a large room, tally the open round's answers PROGRESS_INTERVAL from now unless a tally is already due"""
+    if not game.large:
+        return
+    round_timers.ensure_started()
+    round_timers.schedule_once(('live-progress', game.session_id), PROGRESS_INTERVAL, partial(_progress, game))
+
+
+async def _progress(game):
+    round_ = game.current_round
+    if _games.get(game.session_id) is not game or round_ is None or round_.is_completed:
+        return
+    await _broadcast(game, [('round_progress', {
+        'round_id': round_.db_id,
+        'answered_count': round_.answered_count,
+        'total_players': len(round_.answers),
+        'version': game.version,
+    })])
+
+
+async def _broadcast(game, game_events):
+    channel_layer = get_channel_layer()
+    for event, data in game_events:
+        await channel_layer.group_send(
+            game_group_name(game.session_id), {'type': 'game_event', 'event': event, 'data': data}
+        )
+
+
+async def join(session_id, user_id):
+    """Attach a player's connection to the live game, loading and hosting it on first join"""
+    if not await database_sync_to_async(GameSession.has_participant)(session_id, user_id):
+        raise engine.RuleError('You are not a participant in this game')
+
+    game = _games.get(session_id)
+    if game is None:
+        # Connections arriving while the game loads all wait on the same load
+        task = _loading.get(session_id)
+        if task is None:
+            task = _loading[session_id] = asyncio.ensure_future(_host(session_id))
+        try:
+            game = await task
+        finally:
+            _loading.pop(session_id, None)
+
+    game.connections += 1
+    return game
+
+
+async def leave(game):
+    """Detach a connection; the last one out flushes the game and stops hosting it"""
+    game.connections -= 1
+    if game.connections > 0:
+        return
+    # Later joins load a fresh copy, queued behind the final flush on the database thread
+    if _games.get(game.session_id) is game:
+        del _games[game.session_id]
+    game.closing.set()
+    await game.flusher
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from quiz.archive import archivable_sessions, archive_session
+from quiz.concurrency import StaleWrite
+
+
+class Command(BaseCommand):
+    help = 'Fold finished game sessions into compressed snapshots and delete their rounds and turns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--idle-days', type=int, default=None,
+                            help='Only archive ended sessions with nothing played for this many days')
+        parser.add_argument('--include-active', action='store_true',
+                            help='With --idle-days, also archive sessions nobody ended that have no open round')
+        parser.add_argument('--limit', type=int, default=None, help='Archive at most this many sessions')
+
+    def handle(self, *args, **options):
+        sessions = archivable_sessions(options['idle_days'], options['include_active']).order_by('id')
+        if options['limit']:
+            sessions = sessions[:options['limit']]
+
+        archived = skipped = rounds = stored_bytes = 0
+        for session in sessions:
+            try:
+                archive = archive_session(session)
+            except StaleWrite:
+                # Played since it was selected; it stays in the hot tables
+                skipped += 1
+                continue
+            archived += 1
+            rounds += archive.round_count
+            stored_bytes += len(archive.snapshot)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} sessions ({rounds} rounds, {stored_bytes} compressed bytes), '
+            f'skipped {skipped} in play'
+        ))
@@ -0,0 +1,60 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from quiz.chat import record_written, write_messages
+from quiz.models import GroupChat, GroupMessage, User
+
+
+class Command(BaseCommand):
+    help = 'Benchmark storing chat messages one INSERT at a time against batched write-behind inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=5000)
+        parser.add_argument('--batches', type=int, nargs='+', default=[50, 250, 1000],
+                            help='Batch sizes for the write-behind path')
+
+    def handle(self, *args, **options):
+        count = options['messages']
+
+        elapsed = self.timed(count, self.one_by_one)
+        self.stdout.write(f'   one at a time: {count / elapsed:9.0f} messages/s')
+        for size in options['batches']:
+            elapsed = self.timed(count, lambda group, user, n: self.batched(group, user, n, size))
+            self.stdout.write(f'batches of {size:>5}: {count / elapsed:9.0f} messages/s')
+
+        self.stdout.write(self.style.SUCCESS('Chat benchmark complete'))
+
+    def timed(self, count, store):
+        """
+        Run `store` against a throwaway group, deleted afterwards. Returns seconds taken.
+
+        Nothing wraps `store`, so each path commits as it would in production.
+        """
+        user = User.objects.create(username=f'bench_chat_{uuid.uuid4().hex[:8]}')
+        try:
+            group = GroupChat.objects.create(name='Benchmark', created_by=user)
+            start = time.perf_counter()
+            store(group, user, count)
+            return time.perf_counter() - start
+        finally:
+            # Deleting the user takes its groups and their messages with it
+            user.delete()
+
+    def one_by_one(self, group, user, count):
+        # What GroupMessagesView.post does per message: one transaction, one commit
+        for i in range(count):
+            with transaction.atomic():
+                message = GroupMessage.objects.create(group=group, sender=user, content=f'Message {i}')
+                record_written([message])
+
+    def batched(self, group, user, count, size):
+        # write_messages commits each batch in one transaction
+        for start in range(0, count, size):
+            write_messages([
+                GroupMessage(uid=uuid.uuid4(), group=group, sender=user, content=f'Message {i}', created_at=timezone.now())
+                for i in range(start, min(start + size, count))
+            ])
@@ -0,0 +1,63 @@
+import random
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from quiz import engine
+from quiz.matching import STRATEGIES
+
+
+class Command(BaseCommand):
+    help = 'Simulate complete games with the rules engine, in memory and without a database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=2000, help='Games to play per run')
+        parser.add_argument('--players', type=int, nargs='+', default=[2, 6, 20])
+        parser.add_argument('--strategy', choices=list(STRATEGIES), default=engine.DEFAULT_STRATEGY)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        categories = ['spiritual_knowing', 'mental_knowing', 'physical_knowing', 'creative_fun']
+        words = ['blue', 'the ocean', 'pizza', 'long walks', 'sunset', 'coffee', 'music', 'road trip']
+        strategy = options['strategy']
+
+        for player_count in options['players']:
+            rounds_per_game = engine.MAX_ROUNDS_PER_PLAYER * player_count
+            per_category = rounds_per_game // len(categories) + 1
+            questions = {}
+            for category in categories:
+                for number in range(per_category):
+                    question_id = len(questions) + 1
+                    questions[question_id] = SimpleNamespace(id=question_id, category=category, points=rng.randint(1, 4))
+            deck_order = {
+                category: [q.id for q in questions.values() if q.category == category] for category in categories
+            }
+            player_ids = list(range(1, player_count + 1))
+            # Answers are drawn up front so the timing covers only the rules
+            answers = [rng.choice(words) for _ in range(4096)]
+
+            answered = 0
+            start = time.perf_counter()
+            for _ in range(options['games']):
+                decks = {category: list(deck) for category, deck in deck_order.items()}
+                game = engine.Game(
+                    player_ids, player_ids, questions, decks,
+                    current_turn_user_id=player_ids[0],
+                    strategy_for=lambda question: strategy,
+                )
+                for round_number in range(rounds_per_game):
+                    game.pick(game.current_turn_user_id, categories[round_number % len(categories)])
+                    for player_id in player_ids:
+                        game.answer(player_id, answers[answered & 4095])
+                        answered += 1
+            elapsed = time.perf_counter() - start
+
+            rounds = options['games'] * rounds_per_game
+            self.stdout.write(
+                f'{player_count:>4} players: {rounds / elapsed:10.0f} rounds/s, '
+                f'{answered / elapsed:10.0f} answers/s ({options["games"]} games of {rounds_per_game} rounds)'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Engine simulation complete'))
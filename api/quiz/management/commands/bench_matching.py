@@ -0,0 +1,69 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz import matching
+
+
+# Answers scored per millisecond that matching is built to sustain. Real rounds
+# repeat a small vocabulary of answers, which the normalization and per-round
+# result caches serve; the target is for that workload. The distinct workload
+# is the uncached worst case, bounded by normalizing each answer in Python.
+TARGET_PER_MS = 1000
+TARGET_WORKLOAD = 'typical'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark answer matching strategies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--answers', type=int, default=20000, help='Number of answers to score per run')
+        parser.add_argument('--vocabulary', type=int, default=300, help='Distinct answers in the typical workload')
+
+    def handle(self, *args, **options):
+        words = [
+            'blue', 'green', 'the', 'ocean', 'pizza', 'walks', 'on', 'beach', 'my', 'mom',
+            'coffee', 'morning', 'late', 'night', 'dancing', 'Café', 'music', 'road', 'trip', 'sunset',
+        ]
+        rng = random.Random(42)
+
+        def phrase():
+            return ' '.join(rng.choice(words) for _ in range(rng.randint(1, 5)))
+
+        count = options['answers']
+        common = [phrase() for _ in range(options['vocabulary'])]
+        workloads = {
+            # Every answer is different, so nothing is served from a cache
+            'distinct': [f'{phrase()} {i}' for i in range(count)],
+            # Answers repeat the way they do across real rounds
+            'typical': [rng.choice(common) for _ in range(count)],
+        }
+        picker_answer = 'Long walks on the beach at sunset!'
+
+        for workload, answers in workloads.items():
+            for strategy in matching.STRATEGIES:
+                matching.normalize.cache_clear()
+                matching.tokens.cache_clear()
+                matching.ngrams.cache_clear()
+
+                start = time.perf_counter()
+                matcher = matching.get_matcher(strategy, picker_answer)
+                matched = sum(1 for answer in answers if matcher.matches(answer))
+                elapsed_ms = (time.perf_counter() - start) * 1000
+
+                rate = count / elapsed_ms
+                if workload != TARGET_WORKLOAD:
+                    verdict = 'uncached worst case, no target'
+                elif rate >= TARGET_PER_MS:
+                    verdict = 'meets target'
+                else:
+                    verdict = 'BELOW TARGET'
+                self.stdout.write(
+                    f'{workload:>8} {strategy:>10}: {rate:9.0f} answers/ms ({matched} matched) - {verdict}'
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Matching benchmark complete; the target of {TARGET_PER_MS} answers/ms applies to the '
+            f'{TARGET_WORKLOAD} workload of repeated answers only'
+        ))
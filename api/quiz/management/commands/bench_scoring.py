@@ -0,0 +1,66 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from quiz.engine import compute_points
+from quiz.models import User, Question, GameSession, GameRound, GameTurn
+from quiz.scoring import score_round
+
+
+class Command(BaseCommand):
+    help = 'Benchmark round scoring for groups of 2 to 500 players'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[2, 12, 50, 100, 250, 500])
+        parser.add_argument('--repeat', type=int, default=200, help='Scoring passes per size for the in-memory timing')
+        parser.add_argument('--db', action='store_true', help='Also score real rows (rolled back afterwards) and count queries')
+
+    def handle(self, *args, **options):
+        words = ['blue', 'green', 'red', 'the ocean', 'pizza', 'dark blue', 'yes', 'no']
+
+        for size in options['sizes']:
+            answers = [(player_id, random.choice(words)) for player_id in range(1, size + 1)]
+
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                compute_points(1, 'blue', 2, answers)
+            per_round = (time.perf_counter() - start) / options['repeat']
+
+            line = f'{size:>4} players: {per_round * 1e6:8.1f} us/round in memory'
+            if options['db']:
+                queries, elapsed = self.score_in_db(size, answers)
+                line += f', {elapsed * 1e3:7.2f} ms and {queries} queries against the database'
+            self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS('Scoring benchmark complete'))
+
+    def score_in_db(self, size, answers):
+        """Create a throwaway round of `size` answered turns, score it, then roll everything back"""
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f'bench_scoring_{size}_{i}') for i in range(size)
+            ])
+            question = Question.objects.create(
+                category='creative_fun', question_number=10_000 + size,
+                question_text='Benchmark question', points=2, consequence='None'
+            )
+            session = GameSession.objects.create(session_type='group')
+            round_obj = GameRound.objects.create(
+                session=session, question=question, picker=users[0],
+                picker_answer='blue', player_count=size
+            )
+            GameTurn.objects.bulk_create([
+                GameTurn(round=round_obj, player=user, answer=answer)
+                for user, (_, answer) in zip(users, answers)
+            ])
+
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                score_round(round_obj, 'blue')
+                elapsed = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+        return len(captured.captured_queries), elapsed
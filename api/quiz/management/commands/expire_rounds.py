@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from quiz.timers import due_rounds, expire_round
+
+
+class Command(BaseCommand):
+    help = 'Time out every round past its deadline; for deployments without the ASGI server\'s round timers'
+
+    def handle(self, *args, **options):
+        expired = sum(expire_round(round_id) for round_id, _ in due_rounds(timezone.now()))
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} rounds'))
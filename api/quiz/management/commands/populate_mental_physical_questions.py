@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from quiz.models import Question
+from quiz.catalog import bump_catalog_version
 
 class Command(BaseCommand):
     help = 'Populate Mental Knowing and Physical Knowing questions'
@@ -286,3 +287,6 @@ class Command(BaseCommand):
                 self.stdout.write(f"Question {q_data['number']} already exists")
 
         self.stdout.write(self.style.SUCCESS('\nSuccessfully created 40 questions (20 Mental Knowing + 20 Physical Knowing)!'))
+        
+        # Let running workers know the question catalog changed
+        bump_catalog_version()
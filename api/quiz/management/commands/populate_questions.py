@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from quiz.models import Question
+from quiz.catalog import bump_catalog_version
 
 
 class Command(BaseCommand):
@@ -153,3 +154,6 @@ class Command(BaseCommand):
                 f'\nSuccessfully created {created_count} spiritual knowing questions!'
             )
         )
+        
+        # Let running workers know the question catalog changed
+        bump_catalog_version()
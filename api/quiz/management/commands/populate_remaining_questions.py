@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from quiz.models import Question
+from quiz.catalog import bump_catalog_version
 
 class Command(BaseCommand):
     help = 'Populate Disagreeables & Truth Checks, Romantic Knowing, Erotic Knowing, and Creative & Fun questions'
@@ -222,3 +223,6 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('- Romantic Knowing: 20 questions (81-100)'))
         self.stdout.write(self.style.SUCCESS('- Erotic Knowing: 60 questions (101-160)'))
         self.stdout.write(self.style.SUCCESS('- Creative & Fun: 40 questions (161-200)'))
+        
+        # Let running workers know the question catalog changed
+        bump_catalog_version()
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz.leaderboard import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Rematerialize the global and friends leaderboard ranks from player totals'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        players, friend_rows = rebuild_leaderboards()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Ranked {players} players and {friend_rows} friend rows in {elapsed:.2f}s'
+        ))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from quiz.models import QuestionCategory, Question
+from quiz.catalog import bump_catalog_version
 
 class Command(BaseCommand):
     help = 'Seed the database with 200 quiz questions'
@@ -523,3 +524,6 @@ class Command(BaseCommand):
                 f'Successfully created {created_count} questions across {len(questions_data)} categories'
             )
         )
+        
+        # Let running workers know the question catalog changed
+        bump_catalog_version()
@@ -0,0 +1,131 @@
+"""
+Answer matching strategies used when scoring a round.
+
+The picker's answer is normalized and tokenized once when a matcher is built, and
+then compared against every other player's answer. Normalization of answers is
+cached, since the same short answers come up again and again.
+"""
+import re
+import string
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+
+DEFAULT_STRATEGY = 'contains'
+
+_PUNCTUATION = str.maketrans({char: ' ' for char in string.punctuation})
+_ASCII_PUNCTUATION = bytes.maketrans(string.punctuation.encode(), b' ' * len(string.punctuation))
+_COMBINING_MARKS = re.compile('[\u0300-\u036f]')
+
+
+@lru_cache(maxsize=65536)
+def normalize(text):
+    """Casefold, strip accents and punctuation, and collapse whitespace"""
+    text = text.casefold()
+    if text.isascii():
+        # bytes.translate is several times faster than str.translate
+        return ' '.join(text.encode('ascii').translate(_ASCII_PUNCTUATION).decode('ascii').split())
+    text = _COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text))
+    return ' '.join(text.translate(_PUNCTUATION).split())
+
+
+@lru_cache(maxsize=65536)
+def tokens(text):
+    return frozenset(normalize(text).split())
+
+
+@lru_cache(maxsize=65536)
+def ngrams(text, size=3):
+    padded = f' {normalize(text)} '
+    return frozenset(padded[i:i + size] for i in range(len(padded) - size + 1))
+
+
+class Matcher:
+    """Compares answers against one picker answer, prepared once per round"""
+
+    def __init__(self, picker_answer):
+        self.picker_answer = picker_answer
+        self.target = normalize(picker_answer)
+        self._results = {}
+
+    def matches(self, answer):
+        # Players often give the same answer, so each distinct answer is compared once
+        result = self._results.get(answer)
+        if result is None:
+            result = self._results[answer] = self.compare(answer)
+        return result
+
+    def compare(self, answer):
+        raise NotImplementedError
+
+
+class ExactMatcher(Matcher):
+    """Answers match when they are identical after normalization"""
+
+    def compare(self, answer):
+        return normalize(answer) == self.target
+
+
+class ContainsMatcher(Matcher):
+    """Either answer contains the other after normalization (the original rule)"""
+
+    def compare(self, answer):
+        answer = normalize(answer)
+        if not answer or not self.target:
+            return False
+        return self.target in answer or answer in self.target
+
+
+class TokenSetMatcher(Matcher):
+    """Enough of the shorter answer's words appear in the other answer"""
+
+    threshold = 0.5
+
+    def __init__(self, picker_answer):
+        super().__init__(picker_answer)
+        self.target_tokens = tokens(picker_answer)
+
+    def compare(self, answer):
+        answer_tokens = tokens(answer)
+        if not answer_tokens or not self.target_tokens:
+            return False
+        shared = len(answer_tokens & self.target_tokens)
+        return shared / min(len(answer_tokens), len(self.target_tokens)) >= self.threshold
+
+
+class NgramMatcher(Matcher):
+    """Character trigram (Dice) similarity, tolerant of typos and word order"""
+
+    threshold = 0.6
+
+    def __init__(self, picker_answer):
+        super().__init__(picker_answer)
+        self.target_ngrams = ngrams(picker_answer)
+
+    def compare(self, answer):
+        answer_ngrams = ngrams(answer)
+        total = len(answer_ngrams) + len(self.target_ngrams)
+        if not total:
+            return False
+        return 2 * len(answer_ngrams & self.target_ngrams) / total >= self.threshold
+
+
+STRATEGIES = {
+    'exact': ExactMatcher,
+    'contains': ContainsMatcher,
+    'token_set': TokenSetMatcher,
+    'ngram': NgramMatcher,
+}
+
+
+def strategy_for(question):
+    """The question's own strategy, else its category's default from settings, else 'contains'"""
+    if question.match_strategy:
+        return question.match_strategy
+    category_strategies = getattr(settings, 'ANSWER_MATCH_STRATEGIES', {})
+    return category_strategies.get(question.category, DEFAULT_STRATEGY)
+
+
+def get_matcher(strategy, picker_answer):
+    return STRATEGIES.get(strategy, STRATEGIES[DEFAULT_STRATEGY])(picker_answer)
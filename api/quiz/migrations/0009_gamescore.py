@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_scores(apps, schema_editor):
+    GameSession = apps.get_model('quiz', 'GameSession')
+    GameTurn = apps.get_model('quiz', 'GameTurn')
+    GameScore = apps.get_model('quiz', 'GameScore')
+
+    totals = {}
+    turns = GameTurn.objects.filter(
+        round__isnull=False,
+        answered_at__isnull=False,
+    ).order_by().values('round__session_id', 'player_id').annotate(total=models.Sum('points_earned'))
+    for row in turns:
+        totals[(row['round__session_id'], row['player_id'])] = row['total'] or 0
+
+    scores = []
+    Participant = GameSession.participants.through
+    for row in Participant.objects.values('gamesession_id', 'user_id'):
+        key = (row['gamesession_id'], row['user_id'])
+        scores.append(GameScore(session_id=key[0], player_id=key[1], points=totals.get(key, 0)))
+    GameScore.objects.bulk_create(scores, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_gameround_gameturn_round_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField(default=0)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_scores', to=settings.AUTH_USER_MODEL)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='quiz.gamesession')),
+            ],
+            options={
+                'ordering': ['-points'],
+                'unique_together': {('session', 'player')},
+            },
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_gamescore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='question_decks',
+            field=models.JSONField(default=dict),
+        ),
+    ]
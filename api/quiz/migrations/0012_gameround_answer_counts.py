@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+def backfill_counts(apps, schema_editor):
+    GameRound = apps.get_model('quiz', 'GameRound')
+    rounds = list(GameRound.objects.annotate(
+        slots=models.Count('answers'),
+        answered=models.Count('answers', filter=models.Q(answers__answered_at__isnull=False)),
+    ))
+    for round_obj in rounds:
+        round_obj.player_count = round_obj.slots
+        round_obj.answered_count = round_obj.answered
+    GameRound.objects.bulk_update(rounds, ['player_count', 'answered_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_catalogversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameround',
+            name='answered_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gameround',
+            name='player_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0012_gameround_answer_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='match_strategy',
+            field=models.CharField(blank=True, choices=[('exact', 'Exact'), ('contains', 'Contains'), ('token_set', 'Shared Words'), ('ngram', 'Similar Spelling')], max_length=20),
+        ),
+    ]
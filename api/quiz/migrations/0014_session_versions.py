@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0013_question_match_strategy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameround',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gameturn',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='gameround',
+            index=models.Index(fields=['session', 'version'], name='quiz_gamero_session_e29ec3_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+def backfill_turn_index(apps, schema_editor):
+    GameSession = apps.get_model('quiz', 'GameSession')
+    sessions = []
+    for session in GameSession.objects.exclude(current_turn_user__isnull=True).only('id', 'turn_order', 'current_turn_user_id'):
+        if session.current_turn_user_id in session.turn_order:
+            session.turn_index = session.turn_order.index(session.current_turn_user_id)
+            sessions.append(session)
+    GameSession.objects.bulk_update(sessions, ['turn_index'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0014_session_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='turn_index',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_turn_index, migrations.RunPython.noop),
+    ]
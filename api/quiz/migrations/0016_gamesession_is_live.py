@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0015_gamesession_turn_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='is_live',
+            field=models.BooleanField(default=False),
+        ),
+    ]
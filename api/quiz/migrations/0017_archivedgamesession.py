@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0016_gamesession_is_live'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedGameSession',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='quiz.gamesession')),
+                ('snapshot', models.BinaryField()),
+                ('round_count', models.IntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:10
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_player_stats(apps, schema_editor):
+    GameTurn = apps.get_model('quiz', 'GameTurn')
+    ArchivedGameSession = apps.get_model('quiz', 'ArchivedGameSession')
+    PlayerStats = apps.get_model('quiz', 'PlayerStats')
+
+    totals = {}
+    rows = (
+        GameTurn.objects.filter(round__is_completed=True)
+        .values('player_id')
+        .annotate(points=Sum('points_earned'), rounds=models.Count('id'))
+        .values_list('player_id', 'points', 'rounds')
+        .order_by()
+    )
+    for player_id, points, rounds in rows:
+        totals[player_id] = [points or 0, rounds]
+
+    # Archived sessions no longer have turns, only their snapshots
+    for snapshot in ArchivedGameSession.objects.values_list('snapshot', flat=True).iterator():
+        for round_data in json.loads(zlib.decompress(snapshot))['rounds']:
+            if not round_data['is_completed']:
+                continue
+            for turn in round_data['answers']:
+                player_totals = totals.setdefault(turn['player']['id'], [0, 0])
+                player_totals[0] += turn['points_earned']
+                player_totals[1] += 1
+
+    PlayerStats.objects.bulk_create([
+        PlayerStats(user_id=player_id, total_points=points, rounds_played=rounds)
+        for player_id, (points, rounds) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0017_archivedgamesession'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_points', models.IntegerField(default=0)),
+                ('rounds_played', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('rank', models.PositiveIntegerField(db_index=True)),
+                ('total_points', models.IntegerField()),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FriendLeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField()),
+                ('total_points', models.IntegerField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friend_leaderboard', to=settings.AUTH_USER_MODEL)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['owner', 'rank'],
+                'unique_together': {('owner', 'player')},
+                'indexes': [models.Index(fields=['owner', 'rank'], name='quiz_friend_owner_i_596da1_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_player_stats, migrations.RunPython.noop),
+    ]
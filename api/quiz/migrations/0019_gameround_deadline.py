@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0018_leaderboards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameround',
+            name='deadline',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_history(apps, schema_editor):
+    """
+    Reconstruct a history for existing sessions from what their rows still say:
+    every answer as finally given and every completed round's points, then the
+    turn as it stands. Answers that were later changed are gone, and archived
+    sessions (whose rounds are only in their snapshot) get just their creation.
+    """
+    GameSession = apps.get_model('quiz', 'GameSession')
+    GameRound = apps.get_model('quiz', 'GameRound')
+    GameTurn = apps.get_model('quiz', 'GameTurn')
+    GameEvent = apps.get_model('quiz', 'GameEvent')
+
+    for session in GameSession.objects.order_by('id').iterator():
+        def event(kind, **data):
+            return GameEvent(session_id=session.id, kind=kind, data=data)
+
+        players = list(session.participants.values_list('id', flat=True))
+        events = [event('created', players=players, turn_order=session.turn_order,
+                        turn=session.turn_order[0] if session.turn_order else None)]
+        rounds = GameRound.objects.filter(session=session).select_related('question').order_by('created_at', 'id')
+        for round_obj in rounds:
+            events.append(event(
+                'picked', round=round_obj.id, picker=round_obj.picker_id, question=round_obj.question_id,
+                category=round_obj.question.category, points=round_obj.question.points,
+            ))
+            turns = list(GameTurn.objects.filter(round=round_obj).order_by('answered_at', 'id'))
+            events.extend(
+                event('answered', round=round_obj.id, player=turn.player_id, answer=turn.answer)
+                for turn in turns if turn.answered_at and turn.answer
+            )
+            if round_obj.is_completed:
+                events.append(event(
+                    'scored', round=round_obj.id, timed_out=False,
+                    points=[[turn.player_id, turn.points_earned] for turn in turns],
+                ))
+        events.append(event('turn', index=session.turn_index, user=session.current_turn_user_id))
+        GameEvent.objects.bulk_create(events, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0019_gameround_deadline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='quiz.gamesession')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['session', 'id'], name='quiz_gameev_session_cb6282_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0020_gameevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='mode',
+            field=models.CharField(choices=[('standard', 'Standard'), ('large', 'Large room')], default='standard', max_length=10),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:05
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+def assign_uids(apps, schema_editor):
+    GroupMessage = apps.get_model('quiz', 'GroupMessage')
+    batch = []
+    for message in GroupMessage.objects.filter(uid__isnull=True).only('id').iterator():
+        message.uid = uuid.uuid4()
+        batch.append(message)
+        if len(batch) == 1000:
+            GroupMessage.objects.bulk_update(batch, ['uid'])
+            batch = []
+    GroupMessage.objects.bulk_update(batch, ['uid'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0021_gamesession_mode'),
+    ]
+
+    operations = [
+        # Added empty and filled row by row, since a default would give every existing row the same UID
+        migrations.AddField(
+            model_name='groupmessage',
+            name='uid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(assign_uids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='groupmessage',
+            name='uid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='groupmessage',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,142 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:40
+
+import base64
+import binascii
+import django.db.models.deletion
+import hashlib
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# A frozen copy of quiz.blobs as it was when this migration was written, so
+# later changes to that module (or the models it imports) can't change what
+# this migration does
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+THUMBNAIL_SIZE = (320, 320)
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def decode_image(value):
+    if value.startswith('data:'):
+        value = value.partition(',')[2]
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise InvalidImage
+
+
+def make_thumbnail(image):
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(THUMBNAIL_SIZE)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=80, optimize=True)
+    return output.getvalue()
+
+
+def write_blob(data, digest):
+    """Write an image and its thumbnail to storage; returns the ChatImage fields"""
+    if not data or len(data) > MAX_IMAGE_BYTES:
+        raise InvalidImage
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image.verify()
+        image = Image.open(BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise InvalidImage
+    if image.format not in EXTENSIONS:
+        raise InvalidImage
+
+    prefix = f'chat/{digest[:2]}/{digest}'
+    name, thumbnail_name = f'{prefix}.{EXTENSIONS[image.format]}', f'{prefix}_thumb.jpg'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    if not default_storage.exists(thumbnail_name):
+        thumbnail_name = default_storage.save(thumbnail_name, ContentFile(make_thumbnail(image)))
+
+    return {
+        'sha256': digest,
+        'image': name,
+        'thumbnail': thumbnail_name,
+        'width': image.width,
+        'height': image.height,
+        'size': len(data),
+    }
+
+
+def move_images(apps, schema_editor):
+    """Write each inline base64 image to the blob store and point its message at it"""
+    ChatImage = apps.get_model('quiz', 'ChatImage')
+    GroupMessage = apps.get_model('quiz', 'GroupMessage')
+    messages = GroupMessage.objects.exclude(image__isnull=True).exclude(image='').only('id', 'image')
+    batch = []
+    for message in messages.iterator():
+        try:
+            data = decode_image(message.image)
+            digest = hashlib.sha256(data).hexdigest()
+            if not ChatImage.objects.filter(pk=digest).exists():
+                ChatImage.objects.create(**write_blob(data, digest))
+        except InvalidImage:
+            logger.warning('Dropping unreadable image of group message %s', message.id)
+            continue
+        message.image_blob_id = digest
+        batch.append(message)
+        if len(batch) == 1000:
+            GroupMessage.objects.bulk_update(batch, ['image_blob'])
+            batch = []
+    GroupMessage.objects.bulk_update(batch, ['image_blob'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0022_groupmessage_uid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatImage',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('image', models.ImageField(max_length=255, upload_to='')),
+                ('thumbnail', models.ImageField(max_length=255, upload_to='')),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        # The reference is added next to the base64 column, filled from it, and takes its name
+        migrations.AddField(
+            model_name='groupmessage',
+            name='image_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='messages', to='quiz.chatimage'),
+        ),
+        migrations.RunPython(move_images, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='groupmessage',
+            name='image',
+        ),
+        migrations.RenameField(
+            model_name='groupmessage',
+            old_name='image_blob',
+            new_name='image',
+        ),
+    ]
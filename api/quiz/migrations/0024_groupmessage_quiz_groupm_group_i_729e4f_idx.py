@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0023_chatimage_groupmessage_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupmessage',
+            index=models.Index(fields=['group', 'created_at', 'id'], name='quiz_groupm_group_i_729e4f_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:45
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+def copy_last_messages(apps, schema_editor):
+    """Fill in every group's last message from its messages, in one UPDATE"""
+    GroupChat = apps.get_model('quiz', 'GroupChat')
+    GroupMessage = apps.get_model('quiz', 'GroupMessage')
+    latest = GroupMessage.objects.filter(group=OuterRef('pk')).order_by('-created_at', '-id')
+    GroupChat.objects.update(
+        last_message_uid=Subquery(latest.values('uid')[:1]),
+        last_message_sender=Coalesce(Subquery(latest.values('sender__username')[:1]), Value('')),
+        last_message_text=Coalesce(
+            Subquery(latest.annotate(preview=Substr('content', 1, 50)).values('preview')[:1]), Value('')
+        ),
+        last_message_at=Subquery(latest.values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0024_groupmessage_quiz_groupm_group_i_729e4f_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupchat',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='groupchat',
+            name='last_message_sender',
+            field=models.CharField(blank=True, editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='groupchat',
+            name='last_message_text',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='groupchat',
+            name='last_message_uid',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(copy_last_messages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_cursors(apps, schema_editor):
+    """A read cursor for every current member, with everything sent so far counted as read"""
+    ChatReadCursor = apps.get_model('quiz', 'ChatReadCursor')
+    GroupChat = apps.get_model('quiz', 'GroupChat')
+    memberships = GroupChat.members.through.objects.values_list('groupchat_id', 'user_id', 'groupchat__last_message_at')
+    ChatReadCursor.objects.bulk_create([
+        ChatReadCursor(group_id=group_id, user_id=user_id, last_read_at=last_message_at)
+        for group_id, user_id, last_message_at in memberships.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0025_groupchat_last_message_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatReadCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_cursors', to='quiz.groupchat')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_read_cursors', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'group')},
+            },
+        ),
+        migrations.RunPython(open_cursors, migrations.RunPython.noop),
+    ]
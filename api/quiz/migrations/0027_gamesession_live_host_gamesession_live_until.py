@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0026_chatreadcursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='live_host',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='live_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
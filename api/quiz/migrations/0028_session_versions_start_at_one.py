@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+def start_at_one(apps, schema_editor):
+    """Lift rows still at the old default of 0, so ?since=0 stops matching sessions nobody has fetched"""
+    for model_name in ('GameSession', 'GameRound', 'GameTurn'):
+        apps.get_model('quiz', model_name).objects.filter(version=0).update(version=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0027_gamesession_live_host_gamesession_live_until'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gameround',
+            name='version',
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='gamesession',
+            name='version',
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='gameturn',
+            name='version',
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+        migrations.RunPython(start_at_one, migrations.RunPython.noop),
+    ]
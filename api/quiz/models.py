@@ -1,5 +1,8 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 # Create your models here.
 def upload_thumbnail(instance, filename):
@@ -38,6 +41,11 @@ class GroupChat(models.Model):
     members = models.ManyToManyField(User, related_name='group_chats')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # The newest message, copied here as it is written (see quiz/chat.py) so the group list needn't read messages
+    last_message_uid = models.UUIDField(null=True, blank=True, editable=False)
+    last_message_sender = models.CharField(max_length=150, blank=True, editable=False)
+    last_message_text = models.CharField(max_length=50, blank=True, editable=False)
+    last_message_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     class Meta:
         ordering = ['-updated_at']
@@ -48,19 +56,59 @@ class GroupChat(models.Model):
     def member_count(self):
         return self.members.count()
 
+class ChatImage(models.Model):
+    """An image sent in chat, stored once under the hash of its bytes (see quiz/blobs.py)"""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    image = models.ImageField(max_length=255)
+    thumbnail = models.ImageField(max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.sha256
+
 class GroupMessage(models.Model):
+    # Assigned by the server when the message is accepted, before it is written (see quiz/chat.py)
+    uid = models.UUIDField(default=uuid.uuid4, unique=True, null=True, editable=False)
     group = models.ForeignKey(GroupChat, related_name='messages', on_delete=models.CASCADE)
     sender = models.ForeignKey(User, related_name='group_messages', on_delete=models.CASCADE)
     content = models.TextField(blank=True)
-    image = models.TextField(blank=True, null=True)  # Base64 encoded image
-    created_at = models.DateTimeField(auto_now_add=True)
+    image = models.ForeignKey(ChatImage, related_name='messages', on_delete=models.PROTECT, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         ordering = ['created_at']
+        indexes = [models.Index(fields=['group', 'created_at', 'id'])]
     
     def __str__(self):
         return f'{self.sender.username} in {self.group.name}: {self.content[:50]}'
 
+class ChatReadCursor(models.Model):
+    """
+    How far a member has read a group chat, and how many messages from others
+    have arrived since. Writing a message adds to the count (see quiz/chat.py);
+    marking the chat read resets it.
+    """
+    user = models.ForeignKey(User, related_name='chat_read_cursors', on_delete=models.CASCADE)
+    group = models.ForeignKey(GroupChat, related_name='read_cursors', on_delete=models.CASCADE)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('user', 'group')
+    
+    def __str__(self):
+        return f'{self.user_id} in group {self.group_id}: {self.unread_count} unread'
+    
+    @classmethod
+    def open(cls, group, users):
+        """Start counting for new members, from the group's last message on"""
+        cls.objects.bulk_create([
+            cls(user=user, group=group, last_read_at=group.last_message_at) for user in users
+        ], ignore_conflicts=True)
+
 <<<<<<< HEAD
 
 class SharedCalendar(models.Model):
@@ -160,11 +208,19 @@ class Question(models.Model):
         ('creative_fun', 'Creative & Fun'),
     ]
     
+    MATCH_STRATEGY_CHOICES = [
+        ('exact', 'Exact'),
+        ('contains', 'Contains'),
+        ('token_set', 'Shared Words'),
+        ('ngram', 'Similar Spelling'),
+    ]
+    
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='spiritual_knowing')
     question_number = models.IntegerField()
     question_text = models.TextField()
     points = models.IntegerField(default=2)
     consequence = models.TextField()  # "If wrong" action
+    match_strategy = models.CharField(max_length=20, choices=MATCH_STRATEGY_CHOICES, blank=True)  # Blank uses the category default
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -174,6 +230,14 @@ class Question(models.Model):
     def __str__(self):
         return f'{self.category} Q{self.question_number}: {self.question_text[:50]}'
 
+class CatalogVersion(models.Model):
+    """Single-row stamp bumped by the seed commands whenever questions change"""
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f'Question catalog v{self.version}'
+
 class QuestionResponse(models.Model):
     question = models.ForeignKey(Question, related_name='responses', on_delete=models.CASCADE)
     user = models.ForeignKey(User, related_name='question_responses', on_delete=models.CASCADE)
@@ -194,13 +258,24 @@ class GameSession(models.Model):
         ('direct', 'Direct (1v1)'),
         ('group', 'Group'),
     ]
+    MODE_CHOICES = [
+        ('standard', 'Standard'),
+        ('large', 'Large room'),
+    ]
     
     session_type = models.CharField(max_length=10, choices=SESSION_TYPE_CHOICES)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='standard')  # See LARGE_ROOM_SIZE
     group = models.ForeignKey(GroupChat, related_name='game_sessions', on_delete=models.CASCADE, null=True, blank=True)
     participants = models.ManyToManyField(User, related_name='game_sessions')
     current_turn_user = models.ForeignKey(User, related_name='current_turns', on_delete=models.SET_NULL, null=True, blank=True)
     turn_order = models.JSONField(default=list)  # List of user IDs in turn order
+    turn_index = models.IntegerField(default=0)  # Position of current_turn_user in turn_order
+    question_decks = models.JSONField(default=dict)  # Category -> shuffled question IDs not yet asked
+    version = models.PositiveBigIntegerField(default=1)  # Bumped on every change to the session, its rounds or turns; starts at 1, so ?since=0 is never current
     is_active = models.BooleanField(default=True)
+    is_live = models.BooleanField(default=False)  # Hosted in memory by a GameConsumer process (see quiz/live.py)
+    live_host = models.CharField(max_length=32, blank=True)  # The hosting process, while is_live
+    live_until = models.DateTimeField(null=True, blank=True)  # Host's lease, renewed as it flushes; lapses if it dies
 >>>>>>> main
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -231,22 +306,68 @@ class PlayerAnswer(models.Model):
 =======
         return f'{self.session_type} session - {self.created_at}'
     
+    @property
+    def is_hosted(self):
+        """Live, with a host whose lease hasn't run out"""
+        return self.is_live and self.live_until is not None and self.live_until > timezone.now()
+    
+    @staticmethod
+    def unhosted(prefix=''):
+        """Q for sessions no live host holds, counting those whose host stopped renewing its lease"""
+        return (
+            models.Q(**{f'{prefix}is_live': False})
+            | models.Q(**{f'{prefix}live_until__isnull': True})
+            | models.Q(**{f'{prefix}live_until__lte': timezone.now()})
+        )
+    
+    @classmethod
+    def has_participant(cls, session_id, user_id):
+        """Whether the user plays in the session: who may see its state and take part"""
+        return cls.objects.filter(pk=session_id, participants__id=user_id).exists()
+    
+    @classmethod
+    def bump_version(cls, session_id):
+        """Advance a session's version and return it, for stamping the rows changed alongside it"""
+        cls.objects.filter(pk=session_id).update(version=models.F('version') + 1)
+        return cls.objects.filter(pk=session_id).values_list('version', flat=True).get()
+    
+    def save_versioned(self, **fields):
+        """
+        Write `fields` and bump the version with a compare-and-swap on the version
+        this instance was read at. Raises StaleWrite if anyone has written since.
+        """
+        from .concurrency import compare_and_swap
+        
+        compare_and_swap(GameSession, self.pk, {'version': self.version}, version=self.version + 1, **fields)
+        self.version += 1
+        for name, value in fields.items():
+            setattr(self, name, value)
+    
     def next_turn(self):
-        """Move to the next player's turn"""
-        if not self.turn_order:
-            return
+        """
+        Move to the next player's turn with one small UPDATE, guarded on turn_index
+        so two rounds finishing together both count. The loser re-reads the turn
+        and advances from there.
+        """
+        from .concurrency import StaleWrite, compare_and_swap, with_retries
+        from .engine import next_turn
         
-        current_index = -1
-        if self.current_turn_user:
+        def advance():
+            if not self.turn_order:
+                return
+            turn_index, current_turn_user_id = next_turn(self.turn_order, self.turn_index)
             try:
-                current_index = self.turn_order.index(self.current_turn_user.id)
-            except ValueError:
-                pass
+                compare_and_swap(
+                    GameSession, self.pk, {'turn_index': self.turn_index},
+                    turn_index=turn_index,
+                    current_turn_user_id=current_turn_user_id
+                )
+            except StaleWrite:
+                self.refresh_from_db(fields=['turn_order', 'turn_index'])
+                raise
+            self.turn_index, self.current_turn_user_id = turn_index, current_turn_user_id
         
-        next_index = (current_index + 1) % len(self.turn_order)
-        next_user_id = self.turn_order[next_index]
-        self.current_turn_user = User.objects.get(id=next_user_id)
-        self.save()
+        with_retries(advance)
 
 class GameRound(models.Model):
     """A round represents one question that all players answer"""
@@ -254,11 +375,16 @@ class GameRound(models.Model):
     question = models.ForeignKey(Question, related_name='game_rounds', on_delete=models.CASCADE)
     picker = models.ForeignKey(User, related_name='picked_rounds', on_delete=models.CASCADE)  # Player who picked the category
     picker_answer = models.TextField(blank=True, null=True)
+    player_count = models.IntegerField(default=0)  # Answer slots created for the round
+    answered_count = models.IntegerField(default=0)  # Incremented atomically on each first answer
     is_completed = models.BooleanField(default=False)
+    deadline = models.DateTimeField(null=True, blank=True, db_index=True)  # Completed with whatever answers are in by then
+    version = models.PositiveBigIntegerField(default=1)  # Session version of the last change to this round or its answers
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['created_at']
+        indexes = [models.Index(fields=['session', 'version'])]
     
     def __str__(self):
         return f'Round {self.id} - Q{self.question.question_number} picked by {self.picker.username}'
@@ -270,6 +396,7 @@ class GameTurn(models.Model):
     answer = models.TextField(blank=True, null=True)
     points_earned = models.IntegerField(default=0)
     answered_at = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveBigIntegerField(default=1)  # Session version of the last change to this turn
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -278,4 +405,113 @@ class GameTurn(models.Model):
     
     def __str__(self):
         return f'{self.player.username} - Round {self.round.id if self.round else "None"}'
+
+class GameScore(models.Model):
+    """Running point total for one player in a session, updated when rounds complete"""
+    session = models.ForeignKey(GameSession, related_name='scores', on_delete=models.CASCADE)
+    player = models.ForeignKey(User, related_name='game_scores', on_delete=models.CASCADE)
+    points = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-points']
+        unique_together = ('session', 'player')
+    
+    def __str__(self):
+        return f'{self.player.username} - {self.points} points (session {self.session_id})'
+    
+    @classmethod
+    def add_points(cls, session_id, points_by_player):
+        """
+        Add points to each player's total, one UPDATE per distinct point value.
+        Large rooms only get a row once a player first scores, so missing rows are created.
+        """
+        player_ids_by_points = {}
+        for player_id, points in points_by_player.items():
+            if points:
+                player_ids_by_points.setdefault(points, []).append(player_id)
+        
+        if player_ids_by_points:
+            cls.objects.bulk_create([
+                cls(session_id=session_id, player_id=player_id)
+                for player_ids in player_ids_by_points.values() for player_id in player_ids
+            ], ignore_conflicts=True)
+        for points, player_ids in player_ids_by_points.items():
+            cls.objects.filter(session_id=session_id, player_id__in=player_ids).update(
+                points=models.F('points') + points
+            )
+
+class PlayerStats(models.Model):
+    """Running totals across every game a user has played, updated as rounds complete"""
+    user = models.OneToOneField(User, related_name='stats', on_delete=models.CASCADE, primary_key=True)
+    total_points = models.IntegerField(default=0)
+    rounds_played = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f'{self.user_id}: {self.total_points} points in {self.rounds_played} rounds'
+    
+    @classmethod
+    def record_round(cls, points_by_player):
+        """Add a completed round to each player's totals, one UPDATE per distinct point value"""
+        cls.objects.bulk_create([cls(user_id=player_id) for player_id in points_by_player], ignore_conflicts=True)
+        
+        player_ids_by_points = {}
+        for player_id, points in points_by_player.items():
+            player_ids_by_points.setdefault(points, []).append(player_id)
+        
+        for points, player_ids in player_ids_by_points.items():
+            cls.objects.filter(user_id__in=player_ids).update(
+                total_points=models.F('total_points') + points,
+                rounds_played=models.F('rounds_played') + 1
+            )
+
+class LeaderboardEntry(models.Model):
+    """A player's global rank, rematerialized by the rebuild_leaderboard command"""
+    user = models.OneToOneField(User, related_name='leaderboard_entry', on_delete=models.CASCADE, primary_key=True)
+    rank = models.PositiveIntegerField(db_index=True)
+    total_points = models.IntegerField()
+    
+    class Meta:
+        ordering = ['rank']
+    
+    def __str__(self):
+        return f'#{self.rank} {self.user_id} ({self.total_points} points)'
+
+class FriendLeaderboardEntry(models.Model):
+    """A player's rank among the owner and the owner's friends, rematerialized with the global board"""
+    owner = models.ForeignKey(User, related_name='friend_leaderboard', on_delete=models.CASCADE)
+    player = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    rank = models.PositiveIntegerField()
+    total_points = models.IntegerField()
+    
+    class Meta:
+        ordering = ['owner', 'rank']
+        unique_together = ('owner', 'player')
+        indexes = [models.Index(fields=['owner', 'rank'])]
+    
+    def __str__(self):
+        return f'#{self.rank} {self.player_id} among friends of {self.owner_id}'
+
+class ArchivedGameSession(models.Model):
+    """A finished session's rounds, turns and final scores, folded into one compressed snapshot"""
+    session = models.OneToOneField(GameSession, related_name='archive', on_delete=models.CASCADE, primary_key=True)
+    snapshot = models.BinaryField()  # zlib-compressed JSON, see quiz/archive.py
+    round_count = models.IntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f'Archive of session {self.session_id} ({self.round_count} rounds)'
+
+class GameEvent(models.Model):
+    """One entry in a session's append-only history, written with the change it records; see quiz/history.py"""
+    session = models.ForeignKey(GameSession, related_name='history', on_delete=models.CASCADE)
+    kind = models.CharField(max_length=16)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['session', 'id'])]
+    
+    def __str__(self):
+        return f'{self.kind} in session {self.session_id}'
 >>>>>>> main
@@ -0,0 +1,31 @@
+"""
+Round scoring: a single pass over a round's turns and a single bulk write of the results
+"""
+from .engine import compute_points
+from .matching import strategy_for
+from .models import GameTurn
+
+
+def score_round(round_obj, picker_answer, version=None):
+    """
+    Score a completed round, writing every changed points_earned with one bulk update.
+    Changed turns are stamped with `version` when one is given.
+    """
+    turns = list(GameTurn.objects.filter(round=round_obj).only('id', 'player_id', 'answer', 'points_earned', 'version'))
+    awarded = compute_points(
+        round_obj.picker_id,
+        picker_answer,
+        round_obj.question.points,
+        ((turn.player_id, turn.answer) for turn in turns),
+        strategy_for(round_obj.question),
+    )
+
+    changed = []
+    for turn in turns:
+        if turn.points_earned != awarded[turn.player_id]:
+            turn.points_earned = awarded[turn.player_id]
+            if version is not None:
+                turn.version = version
+            changed.append(turn)
+    GameTurn.objects.bulk_update(changed, ['points_earned', 'version'])
+    return awarded
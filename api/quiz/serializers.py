@@ -5,6 +5,7 @@ from .models import User, GroupChat, GroupMessage, SharedCalendar, CalendarEvent
 =======
 from .models import User, GroupChat, GroupMessage, Question, QuestionResponse, GameSession, GameRound, GameTurn
 >>>>>>> main
+from .blobs import image_fields
 
 
 class SignupSerializer(serializers.ModelSerializer):
@@ -40,24 +41,41 @@ class GroupChatSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'created_by', 'members', 'member_count', 'created_at', 'updated_at', 'last_message')
     
     def get_member_count(self, obj):
+        # Annotated by the group list; counted here for a single group
+        if hasattr(obj, 'num_members'):
+            return obj.num_members
         return obj.member_count()
     
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
-        if last_msg:
-            return {
-                'sender': last_msg.sender.username,
-                'content': last_msg.content[:50],
-                'created_at': last_msg.created_at
-            }
-        return None
+        if obj.last_message_at is None:
+            return None
+        return {
+            'uid': obj.last_message_uid,
+            'sender': obj.last_message_sender,
+            'content': obj.last_message_text,
+            'created_at': obj.last_message_at
+        }
+
+class GroupChatListSerializer(GroupChatSerializer):
+    """A group as listed: everything but the members, plus the unread count, so the whole list is one query"""
+    unread_count = serializers.IntegerField(read_only=True)
+    
+    class Meta(GroupChatSerializer.Meta):
+        fields = ('id', 'name', 'created_by', 'member_count', 'created_at', 'updated_at', 'last_message', 'unread_count')
 
 class GroupMessageSerializer(serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
     
     class Meta:
         model = GroupMessage
-        fields = ('id', 'group', 'sender', 'content', 'image', 'created_at')
+        fields = ('id', 'uid', 'group', 'sender', 'content', 'image', 'created_at')
+    
+    def to_representation(self, obj):
+        # The image by reference: its hash and the URLs of the file and its thumbnail
+        data = super().to_representation(obj)
+        request = self.context.get('request')
+        data.update(image_fields(obj.image, request.build_absolute_uri('/')[:-1] if request else ''))
+        return data
 
 <<<<<<< HEAD
 
@@ -138,14 +156,13 @@ class GameSessionSerializer(serializers.ModelSerializer):
                   'category_picker', 'answers', 'player_scores', 'created_at', 'updated_at')
     
     def get_player_scores(self, obj):
-        """Calculate total points for each player"""
-        scores = {}
-        for player in obj.players.all():
-            total_points = obj.answers.filter(player=player).aggregate(
+        """Calculate total points for each player with a single grouped query"""
+        totals = dict(
+            obj.answers.order_by().values('player_id').annotate(
                 total=models.Sum('points_awarded')
-            )['total'] or 0
-            scores[player.username] = total_points
-        return scores
+            ).values_list('player_id', 'total')
+        )
+        return {player.username: totals.get(player.id) or 0 for player in obj.players.all()}
 
 
 class GameSessionListSerializer(serializers.ModelSerializer):
@@ -177,11 +194,12 @@ class QuestionResponseSerializer(serializers.ModelSerializer):
 class GameSessionSerializer(serializers.ModelSerializer):
     participants = UserSerializer(many=True, read_only=True)
     current_turn_user = UserSerializer(read_only=True)
+    current_turn_user_id = serializers.IntegerField(read_only=True)
     group = GroupChatSerializer(read_only=True)
     
     class Meta:
         model = GameSession
-        fields = ('id', 'session_type', 'group', 'participants', 'current_turn_user', 'turn_order', 'is_active', 'created_at', 'updated_at')
+        fields = ('id', 'session_type', 'mode', 'group', 'participants', 'current_turn_user', 'current_turn_user_id', 'turn_order', 'turn_index', 'is_active', 'created_at', 'updated_at')
 
 class GameTurnSerializer(serializers.ModelSerializer):
     player = UserSerializer(read_only=True)
@@ -193,9 +211,16 @@ class GameTurnSerializer(serializers.ModelSerializer):
 class GameRoundSerializer(serializers.ModelSerializer):
     question = QuestionSerializer(read_only=True)
     picker = UserSerializer(read_only=True)
-    answers = GameTurnSerializer(many=True, read_only=True)
+    answers = serializers.SerializerMethodField()
     
     class Meta:
         model = GameRound
         fields = ('id', 'session', 'question', 'picker', 'picker_answer', 'answers', 'is_completed', 'created_at')
+    
+    def get_answers(self, obj):
+        """The round's turns; callers already holding them pass {round ID: turns} as `answers` in the context"""
+        answers = self.context.get('answers', {}).get(obj.id)
+        if answers is None:
+            answers = obj.answers.all()
+        return GameTurnSerializer(answers, many=True, context=self.context).data
 >>>>>>> main
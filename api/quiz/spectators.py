@@ -0,0 +1,180 @@
+"""
+Read-only spectators of a game.
+
+Spectators sit in their own group, game_<id>_spectators, apart from the players.
+A new spectator gets one compact snapshot. After that, a relay in its process
+follows the players' group and sends the spectators what changed as one delta
+per SPECTATOR_INTERVAL at most, so however busy the game gets, spectators cost
+one state read and one group message per interval.
+
+Snapshots and deltas carry absolute values stamped with the session version: a
+client applies a delta only if its version is newer than what it has. That makes
+the race between a snapshot and the first delta harmless, and likewise duplicate
+deltas when several processes relay the same game.
+"""
+import asyncio
+import logging
+from functools import partial
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+
+from .engine import RuleError
+from .events import game_group_name, question_payload, spectator_group_name
+from .models import GameRound, GameScore, GameSession
+from .timers import round_timers
+
+logger = logging.getLogger(__name__)
+
+SPECTATOR_INTERVAL = 1  # Seconds between deltas
+
+
+def load_state(session_id):
+    """A session's compact state from the database: version, turn, scores and the latest round's progress"""
+    session = GameSession.objects.only('id', 'version', 'current_turn_user_id').get(pk=session_id)
+    round_obj = (
+        GameRound.objects.filter(session_id=session_id).select_related('question').order_by('-created_at', '-id').first()
+    )
+    return {
+        'version': session.version,
+        'current_turn_user_id': session.current_turn_user_id,
+        'scores': dict(GameScore.objects.filter(session_id=session_id).values_list('player_id', 'points')),
+        'round': {
+            'round_id': round_obj.id,
+            'picker_id': round_obj.picker_id,
+            'question': question_payload(round_obj.question),
+            'answered_count': round_obj.answered_count,
+            'total_players': round_obj.player_count,
+            'is_completed': round_obj.is_completed,
+        } if round_obj else None,
+    }
+
+
+def game_state(game):
+    """The same state from a live game hosted in this process, which is ahead of the database"""
+    round_ = game.current_round
+    return {
+        'version': game.version,
+        'current_turn_user_id': game.current_turn_user_id,
+        'scores': dict(game.scores),
+        'round': {
+            'round_id': round_.db_id,
+            'picker_id': round_.picker_id,
+            'question': question_payload(round_.question),
+            'answered_count': round_.answered_count,
+            'total_players': len(round_.answers),
+            'is_completed': round_.is_completed,
+        } if round_ else None,
+    }
+
+
+async def current_state(session_id):
+    from . import live
+
+    game = live._games.get(session_id)
+    if game is not None:
+        return game_state(game)
+    return await database_sync_to_async(load_state)(session_id)
+
+
+def to_message(state, previous=None):
+    """
+    `state` shaped for the socket, or with `previous` only what changed since it.
+    Returns None when nothing a spectator sees has changed.
+    """
+    message = {'version': state['version']}
+    for key in ('current_turn_user_id', 'round'):
+        if previous is None or previous[key] != state[key]:
+            message[key] = state[key]
+    scores = [
+        {'player_id': player_id, 'points': points}
+        for player_id, points in state['scores'].items()
+        if previous is None or previous['scores'].get(player_id) != points
+    ]
+    if scores or previous is None:
+        message['scores'] = scores
+    return message if len(message) > 1 else None
+
+
+class SpectatorRelay:
+    """
+    Per process: for each game watched from here, one channel in the players'
+    group marks the game changed, and a timer sends the spectators a delta
+    against the state they were last sent.
+    """
+
+    def __init__(self):
+        self.watchers = {}  # Session ID -> spectators connected to this process
+        self.followers = {}  # Session ID -> (task reading the players' group, future set once it's in)
+        self.sent = {}  # Session ID -> state the spectators were last sent
+
+    async def watch(self, session_id, user_id):
+        """
+        Register a new spectator and return its snapshot. Only the session's
+        participants may watch, as only they may fetch its state over HTTP.
+        """
+        if not await database_sync_to_async(GameSession.has_participant)(session_id, user_id):
+            raise RuleError('You are not a participant in this game')
+
+        self.watchers[session_id] = self.watchers.get(session_id, 0) + 1
+        if session_id not in self.followers:
+            joined = asyncio.get_running_loop().create_future()
+            self.followers[session_id] = (asyncio.ensure_future(self.follow(session_id, joined)), joined)
+        # Follow the players before reading the state, so no change can go unnoticed
+        await asyncio.shield(self.followers[session_id][1])
+
+        try:
+            state = await current_state(session_id)
+        except GameSession.DoesNotExist:
+            await self.unwatch(session_id)
+            raise RuleError('Session not found')
+
+        # Bring the other spectators up to the newcomer's state, so one baseline serves them all
+        await self.send(session_id, state)
+        return to_message(state)
+
+    async def unwatch(self, session_id):
+        self.watchers[session_id] -= 1
+        if self.watchers[session_id]:
+            return
+        del self.watchers[session_id]
+        self.sent.pop(session_id, None)
+        self.followers.pop(session_id)[0].cancel()
+        round_timers.wheel.cancel(('spectators', session_id))
+
+    async def follow(self, session_id, joined):
+        channel_layer = get_channel_layer()
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(game_group_name(session_id), channel)
+        joined.set_result(None)
+        try:
+            while True:
+                await channel_layer.receive(channel)
+                round_timers.ensure_started()
+                round_timers.schedule_once(
+                    ('spectators', session_id), SPECTATOR_INTERVAL, partial(self.flush, session_id)
+                )
+        finally:
+            await channel_layer.group_discard(game_group_name(session_id), channel)
+
+    async def flush(self, session_id):
+        if session_id not in self.watchers:
+            return
+        try:
+            await self.send(session_id, await current_state(session_id))
+        except GameSession.DoesNotExist:
+            pass  # Deleted; spectators are sent session_deleted like the players
+        except Exception:
+            logger.exception('Could not relay game %s to spectators', session_id)
+
+    async def send(self, session_id, state):
+        previous = self.sent.get(session_id)
+        self.sent[session_id] = state
+        delta = to_message(state, previous) if previous is not None else None
+        if delta:
+            await get_channel_layer().group_send(
+                spectator_group_name(session_id), {'type': 'spectator_delta', 'data': delta}
+            )
+
+
+relay = SpectatorRelay()
@@ -1,3 +1,1152 @@
-from django.test import TestCase
+import base64
+import hashlib
+import json
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image
+
+from . import engine
+from .archive import archive_session
+from .catalog import bump_catalog_version, get_catalog
+from .chat import write_messages
+from .concurrency import StaleWrite
+from .history import fold, rebuild, replay
+from .live import LostGame, load_game, persist
+from .matching import get_matcher, normalize
+from .models import (
+    User, Question, GameSession, GameRound, GameTurn, GameScore, FriendRequest, PlayerStats, GroupChat, GroupMessage,
+    ChatImage, ChatReadCursor, ArchivedGameSession
+)
+from .serializers import GameRoundSerializer
+from .spectators import load_state, relay, to_message
+from .timers import TimerWheel, expire_round, publish_progress
 
 # Create your tests here.
+
+class GameTestMixin:
+    """
+    Helpers for setting up a direct game session between players
+    """
+
+    def create_session(self, *players):
+        session = GameSession.objects.create(session_type='direct')
+        session.participants.set(players)
+        session.turn_order = [p.id for p in players]
+        session.current_turn_user = players[0]
+        session.save()
+        GameScore.objects.bulk_create([GameScore(session=session, player=p) for p in players])
+        return session
+
+    def create_round(self, session, question, picker):
+        players = list(session.participants.all())
+        round_obj = GameRound.objects.create(
+            session=session, question=question, picker=picker, player_count=len(players)
+        )
+        for player in players:
+            GameTurn.objects.create(round=round_obj, player=player)
+        return round_obj
+
+    def answer(self, user, round_obj, text):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('submit-game-answer'), {'round_id': round_obj.id, 'answer': text}, format='json')
+
+
+class GameScoreTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for the per-session score ledger
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+        self.carol = User.objects.create_user(username='carol', password='pw')
+        self.question = Question.objects.create(
+            category='spiritual_knowing', question_number=1,
+            question_text='Favourite colour?', points=3, consequence='Sing'
+        )
+        self.session = self.create_session(self.alice, self.bob, self.carol)
+
+    def test_completed_round_updates_scoreboard(self):
+        """
+        Test that completing a round adds points to the ledger and the detail view reads them
+        """
+        round_obj = self.create_round(self.session, self.question, self.alice)
+        self.answer(self.alice, round_obj, 'Blue')
+        self.answer(self.bob, round_obj, 'dark blue')
+        self.answer(self.carol, round_obj, 'red')
+
+        self.client.force_authenticate(self.alice)
+        response = self.client.get(reverse('game-session-detail', args=[self.session.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['scores'], {'alice': 3, 'bob': 3, 'carol': 0})
+
+    def test_changing_answer_does_not_complete_round(self):
+        """
+        Test that answering twice only counts once towards round completion
+        """
+        round_obj = self.create_round(self.session, self.question, self.alice)
+        self.answer(self.alice, round_obj, 'Blue')
+        first = self.answer(self.bob, round_obj, 'Green')
+        response = self.answer(self.bob, round_obj, 'Blue')
+
+        answered_at = GameTurn.objects.get(round=round_obj, player=self.bob).answered_at
+        self.assertIsNotNone(first.data['turn']['answered_at'])
+        self.assertEqual(first.data['turn']['answered_at'], response.data['turn']['answered_at'])
+        self.assertEqual(parse_datetime(response.data['turn']['answered_at']), answered_at)
+        self.assertEqual(response.data['answered_count'], 2)
+        self.assertFalse(response.data['round_completed'])
+
+        response = self.answer(self.carol, round_obj, 'Blue')
+        self.assertTrue(response.data['round_completed'])
+        self.assertEqual(response.data['points_earned'], 3)
+
+    def test_since_returns_only_changes(self):
+        """
+        Test that polling with ?since returns changed turns only, and 304 when nothing changed
+        """
+        round_obj = self.create_round(self.session, self.question, self.alice)
+        self.client.force_authenticate(self.alice)
+        url = reverse('game-session-detail', args=[self.session.id])
+        version = self.client.get(url).data['version']
+
+        # A client holding nothing gets everything, even from a session nobody has changed
+        response = self.client.get(url, {'since': 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['rounds'][0]['answers']), 3)
+        self.assertEqual(self.client.get(url, {'since': version}).status_code, 304)
+
+        self.answer(self.bob, round_obj, 'Green')
+        self.client.force_authenticate(self.alice)
+        response = self.client.get(url, {'since': version})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.data['version'], version)
+        self.assertEqual(len(response.data['rounds']), 1)
+        answers = response.data['rounds'][0]['answers']
+        self.assertEqual([a['player']['username'] for a in answers], ['bob'])
+
+
+class GameArchiveTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for archiving finished sessions into snapshots
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+        self.question = Question.objects.create(
+            category='physical_knowing', question_number=41,
+            question_text='Tea or coffee?', points=2, consequence='Push-ups'
+        )
+        self.session = self.create_session(self.alice, self.bob)
+
+    def test_archived_session_is_served_from_snapshot(self):
+        """
+        Test that archiving deletes the rounds and the detail view returns the same rounds and scores
+        """
+        round_obj = self.create_round(self.session, self.question, self.alice)
+        self.answer(self.alice, round_obj, 'Tea')
+        self.answer(self.bob, round_obj, 'tea')
+        before = self.client.get(reverse('game-session-detail', args=[self.session.id])).data
+
+        GameSession.objects.filter(pk=self.session.pk).update(is_active=False)
+        call_command('archive_games', stdout=StringIO())
+        since = self.client.get(
+            reverse('game-session-detail', args=[self.session.id]), {'since': before['version']}
+        )
+        self.assertEqual(since.status_code, 200)
+        self.assertTrue(since.data['archived'])
+
+        self.assertFalse(GameRound.objects.filter(session=self.session).exists())
+        self.assertFalse(GameTurn.objects.filter(player=self.bob).exists())
+        after = self.client.get(reverse('game-session-detail', args=[self.session.id])).data
+        self.assertTrue(after['archived'])
+        self.assertEqual(after['scores'], {'alice': 2, 'bob': 2})
+        self.assertEqual(after['rounds'][0]['id'], before['rounds'][0]['id'])
+        self.assertEqual(
+            sorted(a['answer'] for a in after['rounds'][0]['answers']),
+            sorted(a['answer'] for a in before['rounds'][0]['answers'])
+        )
+
+
+    def test_idle_days_leave_active_sessions_unless_asked(self):
+        """
+        Test that --idle-days only archives ended sessions, unless --include-active opts in to idle active ones
+        """
+        ended = self.create_session(self.alice, self.bob)
+        GameSession.objects.filter(pk=ended.pk).update(is_active=False)
+        playing = self.create_session(self.alice, self.bob)
+        self.create_round(playing, self.question, self.alice)
+        GameSession.objects.update(created_at=timezone.now() - timedelta(days=30))
+        GameRound.objects.update(created_at=timezone.now() - timedelta(days=30))
+
+        call_command('archive_games', idle_days=7, stdout=StringIO())
+        self.assertEqual(set(ArchivedGameSession.objects.values_list('session_id', flat=True)), {ended.id})
+
+        call_command('archive_games', idle_days=7, include_active=True, stdout=StringIO())
+        self.assertEqual(
+            set(ArchivedGameSession.objects.values_list('session_id', flat=True)), {ended.id, self.session.id}
+        )
+
+        # A session picked up again between selection and archiving keeps its rows
+        with self.assertRaises(StaleWrite):
+            archive_session(playing)
+        self.assertTrue(GameRound.objects.filter(session=playing).exists())
+
+
+class LeaderboardTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for lifetime totals and the materialized leaderboards
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+        self.carol = User.objects.create_user(username='carol', password='pw')
+        self.dave = User.objects.create_user(username='dave', password='pw')
+        self.question = Question.objects.create(
+            category='erotic_knowing', question_number=121,
+            question_text='Best season?', points=5, consequence='Wink'
+        )
+        FriendRequest.objects.create(from_user=self.alice, to_user=self.carol, status='accepted')
+        FriendRequest.objects.create(from_user=self.dave, to_user=self.alice, status='pending')
+
+    def test_round_completion_feeds_leaderboards(self):
+        """
+        Test that totals grow as rounds complete and the rebuilt ranks are served
+        """
+        session = self.create_session(self.alice, self.bob, self.carol)
+        round_obj = self.create_round(session, self.question, self.bob)
+        self.answer(self.bob, round_obj, 'Summer')
+        self.answer(self.alice, round_obj, 'winter')
+        self.answer(self.carol, round_obj, 'summer')
+
+        self.assertEqual(PlayerStats.objects.get(user=self.carol).total_points, 5)
+        self.assertEqual(PlayerStats.objects.get(user=self.alice).rounds_played, 1)
+
+        call_command('rebuild_leaderboard', stdout=StringIO())
+        self.client.force_authenticate(self.alice)
+        response = self.client.get(reverse('leaderboard'))
+        self.assertEqual([(e['rank'], e['user']['username']) for e in response.data['leaderboard']],
+                         [(1, 'bob'), (1, 'carol'), (3, 'alice')])
+        self.assertEqual(response.data['me'], {'rank': 3, 'total_points': 0})
+
+        response = self.client.get(reverse('friends-leaderboard'))
+        self.assertEqual([(e['rank'], e['user']['username']) for e in response.data['leaderboard']],
+                         [(1, 'carol'), (2, 'alice')])
+
+
+class TurnRotationTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for GameSession.next_turn
+    """
+
+    def test_next_turn_is_a_single_update(self):
+        """
+        Test that advancing the turn wraps around turn_order with one query
+        """
+        players = [User.objects.create_user(username=name, password='pw') for name in ('alice', 'bob')]
+        session = self.create_session(*players)
+
+        with self.assertNumQueries(1):
+            session.next_turn()
+        session.next_turn()
+
+        session.refresh_from_db()
+        self.assertEqual(session.turn_index, 0)
+        self.assertEqual(session.current_turn_user_id, players[0].id)
+
+    def test_stale_writes_do_not_clobber(self):
+        """
+        Test that a stale copy advances from the stored turn and a stale versioned write is refused
+        """
+        players = [User.objects.create_user(username=name, password='pw') for name in ('alice', 'bob', 'carol')]
+        session = self.create_session(*players)
+        stale = GameSession.objects.get(pk=session.pk)
+
+        session.next_turn()
+        stale.next_turn()
+        self.assertEqual(GameSession.objects.get(pk=session.pk).current_turn_user_id, players[2].id)
+
+        GameSession.objects.get(pk=session.pk).save_versioned(question_decks={})
+        with self.assertRaises(StaleWrite):
+            stale.save_versioned(question_decks={})
+
+
+class GroupChatTestCase(APITestCase):
+    """
+    Test case for group chat messages written behind in batches
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.group = GroupChat.objects.create(name='Friends', created_by=self.alice)
+        self.group.members.add(self.alice)
+
+    def test_batch_is_written_with_server_ids(self):
+        """
+        Test that a queued batch keeps its server-assigned IDs and times and moves the group's updated_at
+        """
+        sent_at = timezone.now() + timedelta(seconds=5)
+        messages = [
+            GroupMessage(uid=uuid.uuid4(), group=self.group, sender=self.alice, content=f'Hi {i}', created_at=sent_at)
+            for i in range(3)
+        ]
+        write_messages(messages)
+        # A retried message that was already written is dropped without losing the rest of its batch
+        write_messages([
+            GroupMessage(uid=messages[0].uid, group=self.group, sender=self.alice, content='Hi 0'),
+            GroupMessage(uid=uuid.uuid4(), group=self.group, sender=self.alice, content='Later', created_at=sent_at),
+        ])
+
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.updated_at, sent_at)
+        self.client.force_authenticate(self.alice)
+        response = self.client.get(reverse('group-messages', args=[self.group.id]))
+        uids = {m['uid'] for m in response.data['messages']}
+        self.assertEqual(len(uids), 4)
+        self.assertTrue({str(m.uid) for m in messages} <= uids)
+
+
+    def test_group_list_is_one_query(self):
+        """
+        Test that the group list shows each group's last message and member count from a single query
+        """
+        bob = User.objects.create_user(username='bob', password='pw')
+        self.group.members.add(bob)
+        quiet = GroupChat.objects.create(name='Quiet', created_by=bob)
+        quiet.members.add(self.alice)
+        self.client.force_authenticate(self.alice)
+
+        url = reverse('group-messages', args=[self.group.id])
+        self.client.post(url, {'content': 'First'}, format='json')
+        # Written behind from the socket, a little after the HTTP message
+        write_messages([GroupMessage(
+            uid=uuid.uuid4(), group=self.group, sender=bob, content='x' * 80, created_at=timezone.now()
+        )])
+
+        with self.assertNumQueries(1):
+            groups = self.client.get(reverse('group-list')).data['groups']
+        self.assertEqual([(g['name'], g['member_count']) for g in groups], [('Friends', 2), ('Quiet', 1)])
+        self.assertEqual(groups[0]['last_message']['sender'], 'bob')
+        self.assertEqual(groups[0]['last_message']['content'], 'x' * 50)
+        self.assertIsNone(groups[1]['last_message'])
+
+    def test_unread_counts_follow_inserts_and_read_cursors(self):
+        """
+        Test that messages from others count as unread until marked read, and that the counts come with the group list
+        """
+        bob = User.objects.create_user(username='bob', password='pw')
+        self.group.members.add(bob)
+        ChatReadCursor.open(self.group, [self.alice, bob])
+
+        self.client.force_authenticate(bob)
+        url = reverse('group-messages', args=[self.group.id])
+        self.client.post(url, {'content': 'One'}, format='json')
+        self.client.post(url, {'content': 'Two'}, format='json')
+        sent_at = timezone.now()
+        write_messages([
+            GroupMessage(uid=uuid.uuid4(), group=self.group, sender=sender, content='More', created_at=sent_at)
+            for sender in (bob, self.alice, bob)
+        ])
+
+        def unread(user):
+            self.client.force_authenticate(user)
+            with self.assertNumQueries(1):
+                return self.client.get(reverse('group-list')).data['groups'][0]['unread_count']
+
+        self.assertEqual((unread(self.alice), unread(bob)), (4, 1))
+
+        # Alice has read as far as the second message: only the two bob sent after it are left
+        read_url = reverse('group-mark-read', args=[self.group.id])
+        self.client.force_authenticate(self.alice)
+        latest = self.client.get(url, {'limit': 3}).data
+        first_two = self.client.get(url, {'limit': 2, 'before': latest['before']}).data
+        self.assertEqual([m['content'] for m in first_two['messages']], ['One', 'Two'])
+        with self.assertNumQueries(1):
+            self.client.post(read_url, {'cursor': first_two['after']}, format='json')
+        self.assertEqual(unread(self.alice), 2)
+
+        self.client.post(read_url, {}, format='json')
+        self.assertEqual(unread(self.alice), 0)
+        self.client.force_authenticate(User.objects.create_user(username='carol', password='pw'))
+        self.assertEqual(self.client.post(read_url, {}, format='json').status_code, 404)
+
+    def test_history_pages_by_cursor(self):
+        """
+        Test that history pages back from the latest messages and forward again, ties on created_at included
+        """
+        sent_at = timezone.now()
+        GroupMessage.objects.bulk_create([
+            GroupMessage(group=self.group, sender=self.alice, content=str(i), created_at=sent_at + timedelta(seconds=i // 2))
+            for i in range(7)
+        ])
+        self.client.force_authenticate(self.alice)
+        url = reverse('group-messages', args=[self.group.id])
+
+        pages = [self.client.get(url, {'limit': 3}).data]
+        while pages[-1]['has_more']:
+            pages.append(self.client.get(url, {'limit': 3, 'before': pages[-1]['before']}).data)
+        self.assertEqual([[m['content'] for m in page['messages']] for page in pages], [['4', '5', '6'], ['1', '2', '3'], ['0']])
+
+        newer = self.client.get(url, {'limit': 4, 'after': pages[-1]['after']}).data
+        self.assertEqual([m['content'] for m in newer['messages']], ['1', '2', '3', '4'])
+        self.assertTrue(newer['has_more'])
+        self.assertEqual(self.client.get(url, {'after': pages[0]['after']}).data['messages'], [])
+        self.assertEqual(self.client.get(url, {'before': 'nonsense'}).status_code, 400)
+
+
+class ChatImageTestCase(APITestCase):
+    """
+    Test case for chat images kept in the content-addressed blob store
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.group = GroupChat.objects.create(name='Friends', created_by=self.alice)
+        self.group.members.add(self.alice)
+        self.client.force_authenticate(self.alice)
+
+        output = BytesIO()
+        Image.new('RGBA', (1200, 800), (200, 30, 30, 128)).save(output, 'PNG')
+        self.png = output.getvalue()
+
+    def test_inline_image_is_stored_once_and_sent_by_reference(self):
+        """
+        Test that the same base64 image sent twice is one blob, referenced by both messages
+        """
+        data_url = 'data:image/png;base64,' + base64.b64encode(self.png).decode()
+        url = reverse('group-messages', args=[self.group.id])
+        first = self.client.post(url, {'content': 'Look', 'image': data_url}, format='json')
+        second = self.client.post(url, {'content': 'Again', 'image': data_url}, format='json')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.data['image_id'], hashlib.sha256(self.png).hexdigest())
+        self.assertEqual(first.data['image'], second.data['image'])
+        self.assertEqual(ChatImage.objects.count(), 1)
+
+        image = ChatImage.objects.get()
+        self.assertEqual((image.width, image.height), (1200, 800))
+        with Image.open(image.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 213))
+
+        history = self.client.get(url).data['messages']
+        self.assertEqual([m['thumbnail'] for m in history], ['http://testserver' + image.thumbnail.url] * 2)
+
+    def test_uploaded_image_is_referenced_by_id(self):
+        """
+        Test that an image uploaded once can be sent by its image_id, and that non-images are refused
+        """
+        response = self.client.post(
+            reverse('chat-image-upload'), {'image': SimpleUploadedFile('photo.png', self.png)}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        url = reverse('group-messages', args=[self.group.id])
+        sent = self.client.post(url, {'image_id': response.data['image_id']}, format='json')
+        self.assertEqual(sent.status_code, 201)
+        self.assertEqual(sent.data['image'], response.data['image'])
+
+        for body in ({'image_id': '0' * 64}, {'image': base64.b64encode(b'not an image').decode()}):
+            self.assertEqual(self.client.post(url, body, format='json').status_code, 400)
+        self.assertEqual(GroupMessage.objects.count(), 1)
+
+
+class RoundDeadlineTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for round timeouts
+    """
+
+    def test_timer_wheel_counts_laps(self):
+        """
+        Test that timers further out than one turn of the wheel wait out their laps
+        """
+        wheel = TimerWheel(slots=4)
+        wheel.schedule('soon', 2, 'soon')
+        wheel.schedule('later', 6, 'later')
+        wheel.schedule('cancelled', 1, 'cancelled')
+        wheel.cancel('cancelled')
+
+        fired = [wheel.advance() for _ in range(6)]
+        self.assertEqual(fired, [[], ['soon'], [], [], [], ['later']])
+        self.assertEqual(len(wheel), 0)
+
+    def test_overdue_round_is_expired(self):
+        """
+        Test that an overdue round scores missing answers zero, passes the turn and refuses late answers
+        """
+        alice = User.objects.create_user(username='alice', password='pw')
+        bob = User.objects.create_user(username='bob', password='pw')
+        question = Question.objects.create(
+            category='creative_fun', question_number=1, question_text='Dream trip?', points=2, consequence='Dance'
+        )
+        session = self.create_session(alice, bob)
+        round_obj = self.create_round(session, question, alice)
+        self.answer(alice, round_obj, 'Japan')
+        GameRound.objects.filter(pk=round_obj.pk).update(deadline=timezone.now() - timedelta(seconds=1))
+
+        out = StringIO()
+        call_command('expire_rounds', stdout=out)
+        self.assertIn('Expired 1 rounds', out.getvalue())
+        self.assertFalse(expire_round(round_obj.id))
+
+        round_obj.refresh_from_db()
+        session.refresh_from_db()
+        self.assertTrue(round_obj.is_completed)
+        self.assertEqual(session.current_turn_user_id, bob.id)
+        self.assertEqual(
+            dict(GameScore.objects.filter(session=session).values_list('player__username', 'points')),
+            {'alice': 2, 'bob': 0}
+        )
+        self.assertEqual(self.answer(bob, round_obj, 'Japan').status_code, 409)
+
+    def test_live_game_rounds_are_left_to_their_host(self):
+        """
+        Test that a deadline timer left over from HTTP play doesn't expire a round once its game is live
+        """
+        alice = User.objects.create_user(username='alice', password='pw')
+        bob = User.objects.create_user(username='bob', password='pw')
+        question = Question.objects.create(
+            category='creative_fun', question_number=1, question_text='Dream trip?', points=2, consequence='Dance'
+        )
+        session = self.create_session(alice, bob)
+        round_obj = self.create_round(session, question, alice)
+        GameRound.objects.filter(pk=round_obj.pk).update(deadline=timezone.now() - timedelta(seconds=1))
+        GameSession.objects.filter(pk=session.pk).update(is_live=True, live_until=timezone.now() + timedelta(minutes=1))
+
+        self.assertFalse(expire_round(round_obj.id))
+        round_obj.refresh_from_db()
+        self.assertFalse(round_obj.is_completed)
+        self.assertFalse(PlayerStats.objects.exists())
+
+
+class RoundCreationTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for starting a round with GetRandomQuestionView
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+        Question.objects.create(
+            category='mental_knowing', question_number=21,
+            question_text='Morning or night?', points=2, consequence='Dance'
+        )
+        bump_catalog_version()
+        self.session = self.create_session(self.alice, self.bob)
+
+    def test_round_includes_answer_slot_per_participant(self):
+        """
+        Test that a new round is returned with an empty answer slot for every player
+        """
+        self.client.force_authenticate(self.alice)
+        response = self.client.post(
+            reverse('get-random-question'),
+            {'session_id': self.session.id, 'category': 'mental_knowing'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        answers = response.data['round']['answers']
+        self.assertEqual(sorted(a['player']['username'] for a in answers), ['alice', 'bob'])
+        self.assertEqual(GameTurn.objects.filter(round_id=response.data['round']['id']).count(), 2)
+
+        round_obj = GameRound.objects.select_related('question', 'picker').get(pk=response.data['round']['id'])
+        turns = list(round_obj.answers.select_related('player'))
+        with self.assertNumQueries(0):
+            data = GameRoundSerializer(round_obj, context={'answers': {round_obj.id: turns}}).data
+        self.assertEqual(data['answers'], answers)
+
+    def test_questions_do_not_repeat_within_session(self):
+        """
+        Test that a category runs out once its only question has been asked
+        """
+        self.client.force_authenticate(self.alice)
+        data = {'session_id': self.session.id, 'category': 'mental_knowing'}
+        first = self.client.post(reverse('get-random-question'), data, format='json')
+        round_obj = GameRound.objects.get(pk=first.data['round']['id'])
+        self.answer(self.alice, round_obj, 'Night')
+        self.answer(self.bob, round_obj, 'Morning')
+
+        self.client.force_authenticate(self.bob)
+        second = self.client.post(reverse('get-random-question'), data, format='json')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 404)
+
+    def test_cannot_pick_while_a_round_is_open(self):
+        """
+        Test that the picker can't open a second round before the first is finished
+        """
+        Question.objects.create(
+            category='mental_knowing', question_number=22,
+            question_text='Tea or coffee?', points=2, consequence='Dance'
+        )
+        bump_catalog_version()
+        self.client.force_authenticate(self.alice)
+        data = {'session_id': self.session.id, 'category': 'mental_knowing'}
+        first = self.client.post(reverse('get-random-question'), data, format='json')
+        second = self.client.post(reverse('get-random-question'), data, format='json')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 409)
+        self.assertEqual(second.data['error'], 'The current round has not finished yet')
+        self.assertEqual(GameRound.objects.filter(session=self.session).count(), 1)
+
+        self.client.force_authenticate(self.bob)
+        self.assertEqual(self.client.post(reverse('get-random-question'), data, format='json').status_code, 409)
+
+    def test_round_start_is_pushed_to_game_group(self):
+        """
+        Test that starting a round publishes a round_started event to the game's socket group
+        """
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(f'game_{self.session.id}', channel)
+
+        self.client.force_authenticate(self.alice)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('get-random-question'),
+                {'session_id': self.session.id, 'category': 'mental_knowing'},
+                format='json'
+            )
+
+        message = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(message['event'], 'round_started')
+        self.assertEqual(message['data']['round_id'], response.data['round']['id'])
+        self.assertEqual(message['data']['total_players'], 2)
+
+    def test_session_deletion_is_pushed_to_game_group(self):
+        """
+        Test that deleting a session succeeds and tells the game's socket group which session went
+        """
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(f'game_{self.session.id}', channel)
+
+        self.client.force_authenticate(self.alice)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('delete-game-session', args=[self.session.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(GameSession.objects.filter(pk=self.session.id).exists())
+        message = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(message['event'], 'session_deleted')
+        self.assertEqual(message['data'], {'session_id': self.session.id})
+
+
+class GameHistoryTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for the append-only game history and its replay
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+        Question.objects.create(
+            category='creative_fun', question_number=7,
+            question_text='Superpower?', points=5, consequence='Sing'
+        )
+        bump_catalog_version()
+        self.client.force_authenticate(self.alice)
+        response = self.client.post(
+            reverse('create-game-session'),
+            {'session_type': 'direct', 'participant_ids': [self.bob.id]},
+            format='json'
+        )
+        self.session = GameSession.objects.get(pk=response.data['id'])
+        self.users = {user.id: user for user in (self.alice, self.bob)}
+
+    def test_history_replays_and_rebuilds_an_http_game(self):
+        """
+        Test that a game played over HTTP is streamed back in order and folds to the stored state
+        """
+        picker, other = (self.users[player_id] for player_id in self.session.turn_order)
+        self.client.force_authenticate(picker)
+        response = self.client.post(
+            reverse('get-random-question'),
+            {'session_id': self.session.id, 'category': 'creative_fun'},
+            format='json'
+        )
+        round_obj = GameRound.objects.get(pk=response.data['round']['id'])
+        self.answer(picker, round_obj, 'Flying')
+        self.answer(other, round_obj, 'flying')
+
+        self.client.force_authenticate(picker)
+        response = self.client.get(reverse('game-replay', args=[self.session.id]))
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(
+            [line['kind'] for line in lines],
+            ['created', 'picked', 'answered', 'answered', 'scored', 'turn']
+        )
+        self.assertEqual(lines[1]['round'], round_obj.id)
+
+        game = rebuild(self.session.id)
+        self.session.refresh_from_db()
+        self.assertEqual(game.current_turn_user_id, self.session.current_turn_user_id)
+        self.assertEqual(game.current_round.answers, {picker.id: 'Flying', other.id: 'flying'})
+        self.assertEqual(
+            game.scores,
+            dict(GameScore.objects.filter(session=self.session).values_list('player_id', 'points'))
+        )
+
+    def test_answers_fold_into_the_round_they_name(self):
+        """
+        Test that answers to a finished round are refused and don't leak into the next one when folded
+        """
+        picker, other = (self.users[player_id] for player_id in self.session.turn_order)
+        self.client.force_authenticate(picker)
+        response = self.client.post(
+            reverse('get-random-question'),
+            {'session_id': self.session.id, 'category': 'creative_fun'},
+            format='json'
+        )
+        round_obj = GameRound.objects.get(pk=response.data['round']['id'])
+        self.answer(picker, round_obj, 'Flying')
+        self.answer(other, round_obj, 'flying')
+
+        self.assertEqual(self.answer(other, round_obj, 'Invisible').status_code, 409)
+        self.assertEqual(self.session.history.filter(kind='answered').count(), 2)
+
+        # A late answer already in the history, followed by the next round
+        events = [(kind, data) for _, kind, data, _ in replay(self.session.id)]
+        events += [
+            ('answered', {'round': round_obj.id, 'player': other.id, 'answer': 'Invisible'}),
+            ('picked', {'round': round_obj.id + 1, 'picker': other.id, 'question': 1, 'category': 'x', 'points': 1}),
+            ('answered', {'round': round_obj.id, 'player': picker.id, 'answer': 'Late'}),
+        ]
+        game = fold(events)
+        self.assertEqual(game.current_round.answers, {picker.id: None, other.id: None})
+        self.assertEqual(game.scores, {picker.id: 5, other.id: 5})
+
+    def test_live_game_history_is_flushed(self):
+        """
+        Test that live actions reach the history with the flush, naming the round once it is written
+        """
+        picker, other = (self.users[player_id] for player_id in self.session.turn_order)
+        game = load_game(self.session.id)
+        game.pick(picker.id, 'creative_fun')
+        game.answer(picker.id, 'Flying')
+        game.answer(other.id, 'flying')
+        rounds, changes = game.take_changes()
+        round_ids, catalog = persist(game.session_id, changes)
+        game.mark_flushed(rounds, changes, round_ids, catalog)
+
+        self.assertEqual(game.log, [])
+        round_obj = GameRound.objects.get(session=self.session)
+        self.assertEqual(
+            list(self.session.history.filter(kind='answered').values_list('data__round', flat=True)),
+            [round_obj.id, round_obj.id]
+        )
+        rebuilt = rebuild(self.session.id)
+        self.assertEqual(rebuilt.scores, {picker.id: 5, other.id: 5})
+        self.assertEqual(rebuilt.current_turn_user_id, other.id)
+
+
+@override_settings(LARGE_ROOM_SIZE=3)
+class LargeRoomTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for large-room sessions, which create answer slots lazily and tally progress
+    """
+
+    def setUp(self):
+        self.players = [User.objects.create_user(username=f'player{i}', password='pw') for i in range(3)]
+        Question.objects.create(
+            category='creative_fun', question_number=9,
+            question_text='Theme song?', points=2, consequence='Hum it'
+        )
+        bump_catalog_version()
+        self.client.force_authenticate(self.players[0])
+        response = self.client.post(
+            reverse('create-game-session'),
+            {'session_type': 'direct', 'participant_ids': [p.id for p in self.players[1:]]},
+            format='json'
+        )
+        self.session = GameSession.objects.get(pk=response.data['id'])
+        self.by_turn = [User.objects.get(pk=player_id) for player_id in self.session.turn_order]
+
+    def test_slots_are_created_as_players_answer(self):
+        """
+        Test that a large round starts without slots, answers create them and progress is only tallied
+        """
+        self.assertEqual(self.session.mode, 'large')
+        self.assertFalse(GameScore.objects.filter(session=self.session).exists())
+
+        self.client.force_authenticate(self.by_turn[0])
+        response = self.client.post(
+            reverse('get-random-question'),
+            {'session_id': self.session.id, 'category': 'creative_fun'},
+            format='json'
+        )
+        round_obj = GameRound.objects.get(pk=response.data['round']['id'])
+        self.assertEqual(round_obj.player_count, 3)
+        self.assertFalse(GameTurn.objects.filter(round=round_obj).exists())
+
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(f'game_{self.session.id}', channel)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.answer(self.by_turn[0], round_obj, 'Eye of the tiger')
+            self.answer(self.by_turn[1], round_obj, 'eye of the tiger')
+            publish_progress(round_obj.id)
+
+        message = async_to_sync(channel_layer.receive)(channel)
+        self.assertEqual(message['event'], 'round_progress')
+        self.assertEqual((message['data']['answered_count'], message['data']['total_players']), (2, 3))
+        self.assertEqual(GameTurn.objects.filter(round=round_obj).count(), 2)
+
+        # The player yet to answer has no slot, but the round still waits on them
+        for player, pending in ((self.by_turn[2], round_obj.id), (self.by_turn[0], None)):
+            self.client.force_authenticate(player)
+            sessions = self.client.get(reverse('game-dashboard')).data['sessions']
+            self.assertEqual(sessions[0]['pending_round_id'], pending)
+
+        GameRound.objects.filter(pk=round_obj.pk).update(deadline=timezone.now())
+        expire_round(round_obj.id)
+        self.assertEqual(
+            dict(GameScore.objects.filter(session=self.session).values_list('player_id', 'points')),
+            {self.by_turn[0].id: 2, self.by_turn[1].id: 2}
+        )
+
+    def test_live_large_room_writes_only_answered_slots(self):
+        """
+        Test that a live large room sends no per-answer events and flushes only the slots answered
+        """
+        game = load_game(self.session.id)
+        game.pick(self.by_turn[0].id, 'creative_fun')
+        self.assertEqual(game.answer(self.by_turn[1].id, 'Jaws'), [])
+        rounds, changes = game.take_changes()
+        round_ids, catalog = persist(game.session_id, changes)
+        game.mark_flushed(rounds, changes, round_ids, catalog)
+
+        game.answer(self.by_turn[0].id, 'jaws')
+        game.expire_round()
+        rounds, changes = game.take_changes()
+        persist(game.session_id, changes)
+
+        turns = GameTurn.objects.filter(round_id=round_ids[0])
+        self.assertEqual(
+            dict(turns.values_list('player_id', 'points_earned')),
+            {self.by_turn[0].id: 2, self.by_turn[1].id: 2}
+        )
+        self.assertFalse(PlayerStats.objects.filter(user=self.by_turn[2]).exists())
+
+
+class SpectatorTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for the spectator snapshot and delta messages
+    """
+
+    def test_delta_carries_only_what_changed(self):
+        """
+        Test that after a round completes a delta has the new turn, round and changed scores only
+        """
+        alice = User.objects.create_user(username='alice', password='pw')
+        bob = User.objects.create_user(username='bob', password='pw')
+        carol = User.objects.create_user(username='carol', password='pw')
+        question = Question.objects.create(
+            category='creative_fun', question_number=3, question_text='Karaoke song?', points=3, consequence='Sing'
+        )
+        session = self.create_session(alice, bob, carol)
+        round_obj = self.create_round(session, question, alice)
+
+        before = load_state(session.id)
+        snapshot = to_message(before)
+        self.assertEqual(snapshot['round']['answered_count'], 0)
+        self.assertEqual(len(snapshot['scores']), 3)
+
+        for player, text in ((alice, 'Bohemian Rhapsody'), (bob, 'bohemian rhapsody'), (carol, 'Wonderwall')):
+            self.answer(player, round_obj, text)
+        delta = to_message(load_state(session.id), before)
+
+        self.assertGreater(delta['version'], before['version'])
+        self.assertEqual(delta['current_turn_user_id'], bob.id)
+        self.assertTrue(delta['round']['is_completed'])
+        self.assertEqual(delta['scores'], [{'player_id': alice.id, 'points': 3}, {'player_id': bob.id, 'points': 3}])
+        self.assertIsNone(to_message(load_state(session.id), load_state(session.id)))
+
+    def test_only_participants_can_watch(self):
+        """
+        Test that a user who can't fetch a game over HTTP can't spectate it either
+        """
+        alice = User.objects.create_user(username='alice', password='pw')
+        bob = User.objects.create_user(username='bob', password='pw')
+        mallory = User.objects.create_user(username='mallory', password='pw')
+        session = self.create_session(alice, bob)
+
+        self.client.force_authenticate(mallory)
+        self.assertEqual(self.client.get(reverse('game-session-detail', args=[session.id])).status_code, 403)
+        with self.assertRaisesMessage(engine.RuleError, 'You are not a participant in this game'):
+            async_to_sync(relay.watch)(session.id, mallory.id)
+        self.assertNotIn(session.id, relay.watchers)
+
+
+class QuestionCatalogTestCase(APITestCase):
+    """
+    Test case for serving questions from the cached catalog
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+        self.question = Question.objects.create(
+            category='romantic_knowing', question_number=81,
+            question_text='First date?', points=2, consequence='Hug'
+        )
+        bump_catalog_version()
+        self.client.force_authenticate(self.user)
+
+    def test_catalog_reloads_after_version_bump(self):
+        """
+        Test that new questions only appear once the catalog version is bumped
+        """
+        url = reverse('questions-list') + '?category=romantic_knowing'
+        self.assertEqual(len(self.client.get(url).json()['questions']), 1)
+
+        Question.objects.create(
+            category='romantic_knowing', question_number=82,
+            question_text='Favourite song?', points=2, consequence='Sing'
+        )
+        with self.settings(QUESTION_CATALOG_CHECK_INTERVAL=0):
+            self.assertEqual(len(self.client.get(url).json()['questions']), 1)
+            bump_catalog_version()
+            self.assertEqual(len(self.client.get(url).json()['questions']), 2)
+
+    def test_question_detail(self):
+        """
+        Test that a single question is returned from the catalog, or 404 when unknown
+        """
+        response = self.client.get(reverse('question-detail', args=[self.question.id]))
+        self.assertEqual(response.json()['question_text'], 'First date?')
+
+        response = self.client.get(reverse('question-detail', args=[self.question.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_categories_and_random_questions_need_no_queries(self):
+        """
+        Test that category counts and random picks come from the loaded catalog without touching the database
+        """
+        get_catalog()
+        with self.settings(QUESTION_CATALOG_CHECK_INTERVAL=60), self.assertNumQueries(0):
+            categories = self.client.get(reverse('question-categories')).json()['categories']
+            question = self.client.get(reverse('random-question-by-category', args=['romantic_knowing'])).json()
+            empty = self.client.get(reverse('random-question-by-category', args=['creative_fun']))
+        counts = {c['category']: c['question_count'] for c in categories}
+        self.assertEqual((counts['romantic_knowing'], counts['creative_fun']), (1, 0))
+        self.assertEqual(question['id'], self.question.id)
+        self.assertEqual(empty.status_code, 404)
+        self.assertEqual(self.client.get(reverse('random-question-by-category', args=['nope'])).status_code, 404)
+
+
+class AnswerMatchingTestCase(SimpleTestCase):
+    """
+    Test case for the answer matching strategies
+    """
+
+    def test_normalize(self):
+        self.assertEqual(normalize('  Café, au LAIT! '), 'cafe au lait')
+
+    def test_strategies(self):
+        """
+        Test that each strategy accepts a close answer and rejects an unrelated one
+        """
+        cases = {
+            'exact': ('The Beach!', 'beach'),
+            'contains': ('the beach', 'mountains'),
+            'token_set': ('beach walks at sunset', 'mountains'),
+            'ngram': ('long walks on teh beach', 'mountains'),
+        }
+        for strategy, (close, unrelated) in cases.items():
+            picker = 'the beach' if strategy in ('exact', 'contains') else 'long walks on the beach at sunset'
+            matcher = get_matcher(strategy, picker)
+            self.assertTrue(matcher.matches(close), strategy)
+            self.assertFalse(matcher.matches(unrelated), strategy)
+
+
+class GameEngineTestCase(SimpleTestCase):
+    """
+    Test case for the rules engine, which runs on plain data without a database
+    """
+
+    def test_full_round(self):
+        """
+        Test that a round is scored once everyone answers and the turn passes on
+        """
+        question = SimpleNamespace(id=1, category='creative_fun', points=3)
+        game = engine.Game([1, 2, 3], [1, 2, 3], {1: question}, {'creative_fun': [1]}, current_turn_user_id=1)
+
+        with self.assertRaises(engine.RuleError):
+            game.pick(2, 'creative_fun')
+        game.pick(1, 'creative_fun')
+
+        self.assertEqual(game.answer(1, 'The ocean'), (True, None))
+        self.assertEqual(game.answer(2, 'ocean'), (True, None))
+        self.assertEqual(game.answer(2, 'mountains'), (False, None))
+        with self.assertRaises(engine.RuleError):
+            game.answer(3, 5)  # Answers arrive as JSON, so anything could come in
+        self.assertFalse(game.current_round.is_completed)
+        first_answer, awarded = game.answer(3, 'the ocean!')
+
+        self.assertTrue(first_answer)
+        self.assertEqual(awarded, {1: 3, 2: 0, 3: 3})
+        self.assertEqual(game.scores, {1: 3, 2: 0, 3: 3})
+        self.assertEqual(game.current_turn_user_id, 2)
+        with self.assertRaises(engine.RuleError):
+            game.pick(2, 'creative_fun')  # Deck is empty
+
+
+class GameDashboardTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for the active games dashboard
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+        self.question = Question.objects.create(
+            category='creative_fun', question_number=161,
+            question_text='Dream holiday?', points=1, consequence='Draw'
+        )
+
+    def test_dashboard_query_count_is_fixed(self):
+        """
+        Test that the dashboard costs the same number of queries for one game or many
+        """
+        self.client.force_authenticate(self.bob)
+        self.create_session(self.alice, self.bob)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('game-dashboard'))
+
+        for _ in range(5):
+            session = self.create_session(self.alice, self.bob)
+            self.create_round(session, self.question, self.alice)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('game-dashboard'))
+
+        sessions = response.data['sessions']
+        self.assertEqual(len(sessions), 6)
+        self.assertEqual(sum(1 for s in sessions if s['pending_round_id']), 5)
+        self.assertTrue(all(s['current_turn_user']['username'] == 'alice' for s in sessions))
+        self.assertFalse(any(s['is_my_turn'] for s in sessions))
+
+    def test_active_games_list_every_participant(self):
+        """
+        Test that game/active/ keeps the full session shape, all participants included, while the dashboard previews them
+        """
+        players = [self.alice, self.bob] + [
+            User.objects.create_user(username=f'player{i}', password='pw') for i in range(6)
+        ]
+        session = self.create_session(*players)
+        self.client.force_authenticate(self.bob)
+
+        active = self.client.get(reverse('active-game-sessions')).data['sessions']
+        self.assertEqual(len(active[0]['participants']), 8)
+        self.assertEqual(active[0]['id'], session.id)
+        self.assertIn('turn_order', active[0])
+
+        dashboard = self.client.get(reverse('game-dashboard')).data['sessions']
+        self.assertEqual(len(dashboard[0]['participants']), 6)
+        self.assertEqual(dashboard[0]['participant_count'], 8)
+
+
+class LiveGameTestCase(GameTestMixin, APITestCase):
+    """
+    Test case for real-time games played in memory and persisted write-behind
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+        Question.objects.create(
+            category='romantic_knowing', question_number=101,
+            question_text='Perfect date?', points=4, consequence='Hug'
+        )
+        bump_catalog_version()
+        self.session = self.create_session(self.alice, self.bob)
+
+    def flush(self, game):
+        rounds, changes = game.take_changes()
+        round_ids, catalog = persist(game.session_id, changes)
+        game.mark_flushed(rounds, changes, round_ids, catalog)
+
+    def test_actions_are_persisted_in_batches(self):
+        """
+        Test that a round played in memory reaches the models on the next flushes
+        """
+        game = load_game(self.session.id)
+        game.pick(self.alice.id, 'romantic_knowing')
+        game.answer(self.alice.id, 'Picnic by the lake')
+        self.assertFalse(GameRound.objects.filter(session=self.session).exists())
+
+        self.flush(game)
+        round_obj = GameRound.objects.get(session=self.session)
+        self.assertEqual(game.current_round.db_id, round_obj.id)
+        self.assertEqual(round_obj.answered_count, 1)
+
+        events = game.answer(self.bob.id, 'picnic')
+        self.assertEqual(events[-1][0], 'round_completed')
+        self.flush(game)
+
+        round_obj.refresh_from_db()
+        self.session.refresh_from_db()
+        self.assertTrue(round_obj.is_completed)
+        self.assertEqual(GameTurn.objects.get(round=round_obj, player=self.bob).points_earned, 4)
+        self.assertEqual(GameScore.objects.get(session=self.session, player=self.bob).points, 4)
+        self.assertEqual(self.session.current_turn_user_id, self.bob.id)
+        self.assertEqual(self.session.version, game.version)
+        self.assertEqual(self.session.question_decks['romantic_knowing'], [])
+
+    def test_http_actions_are_refused_while_live(self):
+        """
+        Test that a live game can't also be played through the HTTP endpoints
+        """
+        load_game(self.session.id)
+        self.client.force_authenticate(self.alice)
+        response = self.client.post(
+            reverse('get-random-question'),
+            {'session_id': self.session.id, 'category': 'romantic_knowing'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 409)
+
+    def test_live_claim_is_held_by_a_lease(self):
+        """
+        Test that only one host holds a live game, that its claim lapses with its lease, and that a host
+        whose claim was taken can no longer write
+        """
+        game = load_game(self.session.id)
+        with self.assertRaises(engine.RuleError):
+            load_game(self.session.id)
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.client.delete(reverse('delete-game-session', args=[self.session.id])).status_code, 409)
+
+        # The host died: once its lease runs out another process can claim the game
+        GameSession.objects.filter(pk=self.session.id).update(live_until=timezone.now() - timedelta(seconds=1))
+        load_game(self.session.id)
+        GameSession.objects.filter(pk=self.session.id).update(live_host='another-process')
+
+        game.pick(self.alice.id, 'romantic_knowing')
+        with self.assertRaises(LostGame):
+            self.flush(game)
+        self.assertFalse(GameRound.objects.filter(session=self.session).exists())
@@ -0,0 +1,224 @@
+"""
+Round deadlines (and large rooms' answer tallies), driven by a hashed timer
+wheel on the ASGI event loop.
+
+Rounds due soon are found by a periodic indexed sweep (so rounds created by any
+process are covered) and rounds created in this process are scheduled directly.
+When a timer fires the round is completed with whatever answers are in, the turn
+moves on and the result is pushed to the game's group, just as if the last
+player had answered.
+"""
+import asyncio
+import logging
+import math
+from datetime import timedelta
+from functools import partial
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import events, history
+from .models import GameRound, GameScore, GameSession, PlayerStats
+from .scoring import score_round
+
+logger = logging.getLogger(__name__)
+
+TICK = 1.0  # Seconds per wheel slot, the precision deadlines fire with
+SLOTS = 512
+SWEEP_INTERVAL = 30  # Seconds between sweeps for rounds due soon
+SWEEP_HORIZON = 300  # Seconds ahead a sweep schedules rounds
+PROGRESS_INTERVAL = 2  # Seconds between a large room's answer tallies
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel: one bucket per tick, with timers further out than a
+    full turn of the wheel counting down laps. Scheduling and cancelling are
+    O(1) and each tick looks at a single bucket, so tens of thousands of
+    pending timers cost next to nothing while they wait.
+    """
+
+    def __init__(self, slots=SLOTS):
+        self.slots = slots
+        self.buckets = [{} for _ in range(slots)]  # Key -> [laps left, callback]
+        self.where = {}  # Key -> bucket index
+        self.position = 0
+
+    def __len__(self):
+        return len(self.where)
+
+    def __contains__(self, key):
+        return key in self.where
+
+    def schedule(self, key, ticks, callback):
+        """Fire `callback` after `ticks` advances (at least one), replacing any timer with the same key"""
+        self.cancel(key)
+        ticks = max(1, ticks)
+        index = (self.position + ticks) % self.slots
+        self.buckets[index][key] = [(ticks - 1) // self.slots, callback]
+        self.where[key] = index
+
+    def cancel(self, key):
+        index = self.where.pop(key, None)
+        if index is not None:
+            del self.buckets[index][key]
+
+    def advance(self):
+        """Move one tick on and return the callbacks that are now due"""
+        self.position = (self.position + 1) % self.slots
+        bucket = self.buckets[self.position]
+        due = []
+        for key, entry in list(bucket.items()):
+            if entry[0]:
+                entry[0] -= 1
+            else:
+                del bucket[key]
+                del self.where[key]
+                due.append(entry[1])
+        return due
+
+
+def round_deadline():
+    """Deadline for a round starting now, or None when deadlines are off"""
+    timeout = getattr(settings, 'GAME_ROUND_TIMEOUT', None)
+    return timezone.now() + timedelta(seconds=timeout) if timeout else None
+
+
+def due_rounds(before):
+    """(round ID, deadline) of open rounds due before `before`, leaving live games to their hosts"""
+    return list(
+        GameRound.objects.filter(GameSession.unhosted('session__'), is_completed=False, deadline__lte=before)
+        .values_list('id', 'deadline')
+    )
+
+
+def expire_round(round_id):
+    """
+    Complete a round whose deadline has passed: missing answers score zero, the
+    turn moves on and the result is published. Does nothing if the round was
+    completed (or its deadline moved, or its game went live) in the meantime.
+    Returns whether it expired.
+    """
+    with transaction.atomic():
+        # A live game's host expires its own rounds; this timer may predate the game going live
+        claimed = GameRound.objects.filter(
+            GameSession.unhosted('session__'), pk=round_id, is_completed=False, deadline__lte=timezone.now()
+        ).update(is_completed=True)
+        if not claimed:
+            return False
+
+        round_obj = GameRound.objects.select_related('question', 'session').get(pk=round_id)
+        version = GameSession.bump_version(round_obj.session_id)
+        GameRound.objects.filter(pk=round_id).update(version=version)
+
+        points_by_player = score_round(round_obj, round_obj.picker_answer, version)
+        GameScore.add_points(round_obj.session_id, points_by_player)
+        PlayerStats.record_round(points_by_player)
+
+        session = round_obj.session
+        session.next_turn()
+        events.round_completed(
+            round_obj, round_obj.picker_answer, points_by_player, session.current_turn_user_id, timed_out=True
+        )
+        history.round_ended(round_obj, points_by_player, session, timed_out=True)
+    return True
+
+
+def publish_progress(round_id):
+    """Send a large room's current answer tally, unless the round has completed since"""
+    round_obj = GameRound.objects.only('id', 'session_id', 'answered_count', 'player_count').filter(
+        pk=round_id, is_completed=False
+    ).first()
+    if round_obj is not None:
+        events.round_progress(round_obj, round_obj.answered_count, round_obj.player_count)
+
+
+class RoundTimers:
+    """The wheel plus the task that turns it, one per event loop"""
+
+    def __init__(self):
+        self.wheel = TimerWheel()
+        self.loop = None
+        self.task = None
+
+    def ensure_started(self):
+        """Start turning the wheel on the running loop, if it isn't already"""
+        if self.task is None or self.task.done():
+            self.loop = asyncio.get_running_loop()
+            self.task = self.loop.create_task(self.run())
+
+    def schedule(self, key, delay, callback):
+        """Run the coroutine function `callback` after `delay` seconds. Call from the loop."""
+        self.wheel.schedule(key, math.ceil(delay / TICK), callback)
+
+    def schedule_round(self, round_id, deadline):
+        """Expire a database round at its deadline. Safe to call from any thread."""
+        if self.loop is None or self.loop.is_closed():
+            return  # Not running in this process; the next sweep anywhere will find it
+        delay = (deadline - timezone.now()).total_seconds()
+        self.loop.call_soon_threadsafe(self.schedule, ('round', round_id), delay, partial(self.expire, round_id))
+
+    def cancel_round(self, round_id):
+        """Drop a database round's deadline timer, if this process has one. Safe to call from any thread."""
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.wheel.cancel, ('round', round_id))
+
+    def schedule_progress(self, round_id):
+        """
+        Tally a large round's answers PROGRESS_INTERVAL from now, once however many
+        answers arrive in between. Safe to call from any thread.
+        """
+        if self.loop is None or self.loop.is_closed():
+            return  # No timers here; clients catch up when the round completes
+        self.loop.call_soon_threadsafe(
+            self.schedule_once, ('progress', round_id), PROGRESS_INTERVAL, partial(self.progress, round_id)
+        )
+
+    def schedule_once(self, key, delay, callback):
+        """Like schedule, but leaves a pending timer with the same key alone"""
+        if key not in self.wheel:
+            self.schedule(key, delay, callback)
+
+    async def progress(self, round_id):
+        try:
+            await database_sync_to_async(publish_progress)(round_id)
+        except Exception:
+            logger.exception('Could not publish progress for round %s', round_id)
+
+    async def expire(self, round_id):
+        try:
+            await database_sync_to_async(expire_round)(round_id)
+        except Exception:
+            logger.exception('Could not expire round %s', round_id)
+
+    async def sweep(self):
+        now = timezone.now()
+        rounds = await database_sync_to_async(due_rounds)(now + timedelta(seconds=SWEEP_HORIZON))
+        for round_id, deadline in rounds:
+            key = ('round', round_id)
+            if key not in self.wheel:
+                self.schedule(key, (deadline - now).total_seconds(), partial(self.expire, round_id))
+
+    async def run(self):
+        next_tick = self.loop.time()
+        ticks_per_sweep = max(1, round(SWEEP_INTERVAL / TICK))
+        ticks = 0
+        while True:
+            if ticks % ticks_per_sweep == 0:
+                try:
+                    await self.sweep()
+                except Exception:
+                    logger.exception('Round deadline sweep failed')
+
+            # Sleep to the next tick boundary so time spent firing timers doesn't add drift
+            next_tick += TICK
+            await asyncio.sleep(max(0.0, next_tick - self.loop.time()))
+            ticks += 1
+            for callback in self.wheel.advance():
+                self.loop.create_task(callback())
+
+
+round_timers = RoundTimers()
@@ -13,6 +13,8 @@ from .views import (
     GroupChatDetailView,
     GroupMessagesView,
     AddGroupMembersView,
+    ChatImageUploadView,
+    MarkGroupReadView,
 <<<<<<< HEAD
     CalendarListCreateView,
     CalendarDetailView,
@@ -33,14 +35,20 @@ from .views import (
 =======
     QuestionsListView,
     QuestionDetailView,
+    QuestionCategoriesView,
+    RandomQuestionView,
     SubmitAnswerView,
     UserResponsesView,
     CreateGameSessionView,
     GetRandomQuestionView,
     SubmitGameAnswerView,
     GameSessionDetailView,
+    GameReplayView,
     ActiveGameSessionsView,
-    DeleteGameSessionView
+    GameDashboardView,
+    DeleteGameSessionView,
+    GlobalLeaderboardView,
+    FriendsLeaderboardView
 >>>>>>> main
 )
 
@@ -57,6 +65,8 @@ urlpatterns = [
     path('groups/', GroupChatListView.as_view(), name='group-list'),
     path('groups/<int:group_id>/', GroupChatDetailView.as_view(), name='group-detail'),
     path('groups/<int:group_id>/messages/', GroupMessagesView.as_view(), name='group-messages'),
+    path('groups/<int:group_id>/read/', MarkGroupReadView.as_view(), name='group-mark-read'),
+    path('chat/images/', ChatImageUploadView.as_view(), name='chat-image-upload'),
 <<<<<<< HEAD
     path('groups/<int:group_id>/add-members/', AddGroupMembersView.as_view(), name='add-group-members'),
     # Calendar routes
@@ -84,13 +94,20 @@ urlpatterns = [
     path('groups/<int:group_id>/members/add/', AddGroupMembersView.as_view(), name='add-group-members'),
     path('questions/', QuestionsListView.as_view(), name='questions-list'),
     path('questions/<int:question_id>/', QuestionDetailView.as_view(), name='question-detail'),
+    path('questions/categories/', QuestionCategoriesView.as_view(), name='question-categories'),
+    path('questions/random/', RandomQuestionView.as_view(), name='random-question'),
+    path('questions/random/<str:category>/', RandomQuestionView.as_view(), name='random-question-by-category'),
     path('questions/answer/', SubmitAnswerView.as_view(), name='submit-answer'),
     path('questions/responses/', UserResponsesView.as_view(), name='user-responses'),
     path('game/create/', CreateGameSessionView.as_view(), name='create-game-session'),
     path('game/<int:session_id>/', GameSessionDetailView.as_view(), name='game-session-detail'),
     path('game/<int:session_id>/delete/', DeleteGameSessionView.as_view(), name='delete-game-session'),
+    path('game/<int:session_id>/replay/', GameReplayView.as_view(), name='game-replay'),
     path('game/random-question/', GetRandomQuestionView.as_view(), name='get-random-question'),
     path('game/answer/', SubmitGameAnswerView.as_view(), name='submit-game-answer'),
     path('game/active/', ActiveGameSessionsView.as_view(), name='active-game-sessions'),
+    path('game/dashboard/', GameDashboardView.as_view(), name='game-dashboard'),
+    path('leaderboard/', GlobalLeaderboardView.as_view(), name='leaderboard'),
+    path('leaderboard/friends/', FriendsLeaderboardView.as_view(), name='friends-leaderboard'),
 >>>>>>> main
 ]
\ No newline at end of file
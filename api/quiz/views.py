@@ -1,4 +1,5 @@
 from django.shortcuts import render
+from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response 
@@ -248,7 +249,7 @@ class CreateGroupChatView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        from .models import GroupChat
+        from .models import ChatReadCursor, GroupChat
         from .serializers import GroupChatSerializer
         
         name = request.data.get('name', '').strip()
@@ -278,6 +279,7 @@ class CreateGroupChatView(APIView):
         # Add members (including creator)
         group.members.add(request.user)
         group.members.add(*members)
+        ChatReadCursor.open(group, [request.user, *members])
         
         serializer = GroupChatSerializer(group)
         return Response(serializer.data, status=201)
@@ -286,11 +288,18 @@ class GroupChatListView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        from .models import GroupChat
-        from .serializers import GroupChatSerializer
-        
-        groups = GroupChat.objects.filter(members=request.user)
-        serializer = GroupChatSerializer(groups, many=True)
+        from .models import ChatReadCursor, GroupChat
+        from .serializers import GroupChatListSerializer
+        from django.db.models import Count, OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+        
+        cursors = ChatReadCursor.objects.filter(group=OuterRef('pk'), user=request.user)
+        # Counted before filtering, so the count isn't limited to the member filtered on
+        groups = GroupChat.objects.annotate(
+            num_members=Count('members'),
+            unread_count=Coalesce(Subquery(cursors.values('unread_count')[:1]), 0),
+        ).filter(members=request.user).select_related('created_by')
+        serializer = GroupChatListSerializer(groups, many=True)
         return Response({'groups': serializer.data}, status=200)
 
 class GroupChatDetailView(APIView):
@@ -312,21 +321,53 @@ class GroupMessagesView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, group_id):
+        """
+        A page of the group's messages, oldest first: the latest by default, or
+        those just before or after a cursor from an earlier page
+        """
         from .models import GroupChat, GroupMessage
         from .serializers import GroupMessageSerializer
+        from .chat import MAX_PAGE_SIZE, PAGE_SIZE, decode_cursor, encode_cursor, message_page
         
         try:
             group = GroupChat.objects.get(id=group_id, members=request.user)
         except GroupChat.DoesNotExist:
             return Response({'error': 'Group not found or access denied'}, status=404)
         
-        messages = group.messages.all()[:100]  # Last 100 messages
-        serializer = GroupMessageSerializer(messages, many=True)
-        return Response({'messages': serializer.data}, status=200)
+        try:
+            limit = min(int(request.query_params.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=400)
+        
+        before = request.query_params.get('before')
+        after = request.query_params.get('after')
+        try:
+            before = decode_cursor(before) if before else None
+            after = decode_cursor(after) if after else None
+        except ValueError:
+            return Response({'error': 'Invalid cursor'}, status=400)
+        
+        messages, has_more = message_page(
+            group.messages.select_related('sender', 'image'), before, after, max(limit, 1)
+        )
+        serializer = GroupMessageSerializer(messages, many=True, context={'request': request})
+        return Response({
+            'messages': serializer.data,
+            'has_more': has_more,
+            # Pass back as ?before= for older messages, or as ?after= to poll for newer ones
+            'before': encode_cursor(messages[0]) if messages else request.query_params.get('before'),
+            'after': encode_cursor(messages[-1]) if messages else request.query_params.get('after'),
+        }, status=200)
     
     def post(self, request, group_id):
+        """Store a message over HTTP; the group's chat socket (see quiz/chat.py) is the primary way to send"""
         from .models import GroupChat, GroupMessage
         from .serializers import GroupMessageSerializer
+        from .blobs import InvalidImage, resolve_image
+        from .chat import chat_group_name, message_event, record_written
+        from django.db import transaction
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
         
         try:
             group = GroupChat.objects.get(id=group_id, members=request.user)
@@ -335,28 +376,99 @@ class GroupMessagesView(APIView):
         
         content = request.data.get('content', '').strip()
         image = request.data.get('image', '')
+        image_id = request.data.get('image_id', '')
         
-        if not content and not image:
+        if not content and not image and not image_id:
             return Response({'error': 'Message content or image is required'}, status=400)
         
-        message = GroupMessage.objects.create(
-            group=group,
-            sender=request.user,
-            content=content,
-            image=image
+        # Inline base64 images are stored in the blob store; the message keeps a reference
+        try:
+            image = resolve_image(image, image_id)
+        except InvalidImage as e:
+            return Response({'error': str(e)}, status=400)
+        
+        with transaction.atomic():
+            message = GroupMessage.objects.create(
+                group=group,
+                sender=request.user,
+                content=content,
+                image=image
+            )
+            record_written([message])
+        
+        # Members connected to the group's chat room see it too
+        channel_layer = get_channel_layer()
+        if channel_layer is not None:
+            async_to_sync(channel_layer.group_send)(
+                chat_group_name(group.id),
+                message_event(message, request.user.username, request.build_absolute_uri('/')[:-1])
+            )
+        
+        serializer = GroupMessageSerializer(message, context={'request': request})
+        return Response(serializer.data, status=201)
+
+class MarkGroupReadView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, group_id):
+        """
+        Mark the group read, up to the message at `cursor` (one from a history
+        page) or to the end. Either way, one UPDATE of the member's read cursor.
+        """
+        from .models import ChatReadCursor, GroupMessage
+        from .chat import decode_cursor
+        from django.db.models import Count, Subquery
+        from django.db.models.functions import Coalesce
+        from django.utils import timezone
+        
+        cursor = request.data.get('cursor')
+        if cursor:
+            try:
+                created_at, message_id = decode_cursor(cursor)
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=400)
+            # Whatever others sent after that message is still unread
+            later = GroupMessage.objects.filter(group_id=group_id, created_at__gte=created_at).exclude(
+                created_at=created_at, id__lte=message_id
+            ).exclude(sender=request.user)
+            unread_count = Coalesce(Subquery(later.order_by().values('group').annotate(n=Count('id')).values('n')), 0)
+        else:
+            created_at, unread_count = timezone.now(), 0
+        
+        updated = ChatReadCursor.objects.filter(group_id=group_id, user=request.user).update(
+            last_read_at=created_at, unread_count=unread_count
         )
+        if not updated:
+            return Response({'error': 'Group not found or access denied'}, status=404)
+        return Response({'message': 'Marked as read'}, status=200)
+
+class ChatImageUploadView(APIView):
+    """Upload an image to send in chat; messages then refer to it by its image_id"""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def post(self, request):
+        from .blobs import MAX_IMAGE_BYTES, InvalidImage, image_fields, store_image
         
-        # Update group's updated_at timestamp
-        group.save()
+        if 'image' not in request.FILES:
+            return Response({'error': 'No image file provided'}, status=400)
         
-        serializer = GroupMessageSerializer(message)
-        return Response(serializer.data, status=201)
+        upload = request.FILES['image']
+        if upload.size > MAX_IMAGE_BYTES:
+            return Response({'error': f'Images can be at most {MAX_IMAGE_BYTES // (1024 * 1024)} MB'}, status=400)
+        
+        try:
+            image = store_image(upload.read())
+        except InvalidImage as e:
+            return Response({'error': str(e)}, status=400)
+        
+        return Response(image_fields(image, request.build_absolute_uri('/')[:-1]), status=201)
 
 class AddGroupMembersView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, group_id):
-        from .models import GroupChat
+        from .models import ChatReadCursor, GroupChat
         
         try:
             group = GroupChat.objects.get(id=group_id, members=request.user)
@@ -381,6 +493,7 @@ class AddGroupMembersView(APIView):
             return Response({'error': 'Some users not found'}, status=404)
         
         group.members.add(*members)
+        ChatReadCursor.open(group, members)
         
         return Response({'message': f'{members.count()} members added'}, status=200)
 
@@ -606,25 +719,22 @@ class RandomQuestionView(APIView):
     def get(self, request, category=None):
         from .models import Question, QuestionCategory
         from .serializers import QuestionSerializer
-        import random
+        from .decks import pick_random_question
         
         if category:
             try:
                 cat = QuestionCategory.objects.get(category=category)
-                questions = list(Question.objects.filter(category=cat))
-                if not questions:
+                question = pick_random_question(Question.objects.filter(category=cat))
+                if question is None:
                     return Response({'error': 'No questions in this category'}, status=404)
-                question = random.choice(questions)
                 serializer = QuestionSerializer(question)
                 return Response(serializer.data)
             except QuestionCategory.DoesNotExist:
                 return Response({'error': 'Category not found'}, status=404)
         else:
-            from .models import Question
-            questions = list(Question.objects.all())
-            if not questions:
+            question = pick_random_question(Question.objects.all())
+            if question is None:
                 return Response({'error': 'No questions found'}, status=404)
-            question = random.choice(questions)
             serializer = QuestionSerializer(question)
             return Response(serializer.data)
 
@@ -645,20 +755,17 @@ class CreateGameSessionView(APIView):
         if friends.count() != len(friend_ids):
             return Response({'error': 'Some users not found'}, status=404)
         
-        # Create game session
+        # Create game session, with the creator as the first category picker
         game = GameSession.objects.create(
             creator=request.user,
-            status='waiting'
+            status='waiting',
+            category_picker=request.user
         )
         
         # Add creator and friends
         game.players.add(request.user)
         game.players.add(*friends)
         
-        # Set first player as category picker
-        game.category_picker = request.user
-        game.save()
-        
         serializer = GameSessionSerializer(game)
         return Response(serializer.data, status=201)
 
@@ -711,16 +818,31 @@ class StartGameRoundView(APIView):
             return Response({'error': 'Category not found'}, status=404)
         
         # Get a random question from the category
-        import random
-        questions = list(Question.objects.filter(category=category))
-        if not questions:
+        from .decks import pick_random_question
+        question = pick_random_question(Question.objects.filter(category=category))
+        if question is None:
             return Response({'error': 'No questions in this category'}, status=404)
         
-        question = random.choice(questions)
+        from django.utils import timezone
+        from .concurrency import StaleWrite, compare_and_swap
+        
+        # Write only the changed columns, and only if no one has started a round
+        # or moved the picker since the game was read
+        try:
+            compare_and_swap(
+                GameSession, game.pk,
+                {'current_round': game.current_round, 'category_picker_id': game.category_picker_id},
+                current_question=question,
+                current_round=game.current_round + 1,
+                status='in_progress',
+                updated_at=timezone.now()
+            )
+        except StaleWrite:
+            return Response({'error': 'The game changed, please try again'}, status=409)
+        
         game.current_question = question
         game.current_round += 1
         game.status = 'in_progress'
-        game.save()
         
         serializer = GameSessionSerializer(game)
         return Response(serializer.data)
@@ -730,28 +852,46 @@ class QuestionsListView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        from .models import Question
-        from .serializers import QuestionSerializer
+        from .catalog import get_catalog
         
+        # Questions are served pre-rendered from the in-process catalog
         category = request.query_params.get('category', 'spiritual_knowing')
-        questions = Question.objects.filter(category=category)
-        serializer = QuestionSerializer(questions, many=True)
-        
-        return Response({'questions': serializer.data}, status=200)
+        body = b'{"questions":' + get_catalog().category_json(category) + b'}'
+        return HttpResponse(body, content_type='application/json', status=200)
 
 class QuestionDetailView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, question_id):
-        from .models import Question
-        from .serializers import QuestionSerializer
+        from .catalog import get_catalog
         
-        try:
-            question = Question.objects.get(id=question_id)
-            serializer = QuestionSerializer(question)
-            return Response(serializer.data, status=200)
-        except Question.DoesNotExist:
+        body = get_catalog().question_json.get(question_id)
+        if body is None:
             return Response({'error': 'Question not found'}, status=404)
+        return HttpResponse(body, content_type='application/json', status=200)
+
+class QuestionCategoriesView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        from .catalog import get_catalog
+        
+        body = b'{"categories":' + get_catalog().categories_json + b'}'
+        return HttpResponse(body, content_type='application/json', status=200)
+
+class RandomQuestionView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, category=None):
+        from .catalog import get_catalog
+        
+        catalog = get_catalog()
+        if category and category not in catalog.category_names:
+            return Response({'error': 'Category not found'}, status=404)
+        body = catalog.random_question_json(category)
+        if body is None:
+            return Response({'error': 'No questions found'}, status=404)
+        return HttpResponse(body, content_type='application/json', status=200)
 >>>>>>> main
 
 class SubmitAnswerView(APIView):
@@ -831,20 +971,34 @@ class NextRoundView(APIView):
         if game.creator != request.user:
             return Response({'error': 'Only the game creator can advance to next round'}, status=403)
         
-        # Get list of players and find next picker
-        players = list(game.players.all())
-        current_index = players.index(game.category_picker) if game.category_picker in players else -1
-        next_index = (current_index + 1) % len(players)
+        from django.utils import timezone
+        from .concurrency import StaleWrite, compare_and_swap
+        from .engine import is_game_over, next_picker
         
-        game.category_picker = players[next_index]
-        game.current_question = None
+        # Find the next picker from player IDs alone, without loading every User
+        player_ids = list(game.players.values_list('id', flat=True))
+        picker_id = next_picker(player_ids, game.category_picker_id)
         
         # Check if game should end (after all players have picked once per round)
-        max_rounds = 3  # Configurable
-        if game.current_round >= max_rounds * len(players):
-            game.status = 'completed'
+        status = 'completed' if is_game_over(game.current_round, len(player_ids)) else game.status
         
-        game.save()
+        # A double-tapped "next round" must not skip a player, so the write only
+        # applies if the picker and round are still what this request read
+        try:
+            compare_and_swap(
+                GameSession, game.pk,
+                {'current_round': game.current_round, 'category_picker_id': game.category_picker_id},
+                category_picker_id=picker_id,
+                current_question=None,
+                status=status,
+                updated_at=timezone.now()
+            )
+        except StaleWrite:
+            return Response({'error': 'The game changed, please try again'}, status=409)
+        
+        game.category_picker_id = picker_id
+        game.current_question = None
+        game.status = status
         
         serializer = GameSessionSerializer(game)
         return Response(serializer.data)
@@ -865,7 +1019,7 @@ class EndGameView(APIView):
             return Response({'error': 'Only the game creator can end the game'}, status=403)
         
         game.status = 'completed'
-        game.save()
+        game.save(update_fields=['status', 'updated_at'])
         
         serializer = GameSessionSerializer(game)
         return Response(serializer.data)
@@ -916,8 +1070,11 @@ class CreateGameSessionView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        from .models import GameSession, GroupChat
+        from .models import GameSession, GroupChat, GameScore
         from .serializers import GameSessionSerializer
+        from .decks import build_decks
+        from . import history
+        from django.conf import settings
         import random
         
         session_type = request.data.get('session_type')  # 'direct' or 'group'
@@ -928,14 +1085,10 @@ class CreateGameSessionView(APIView):
             return Response({'error': 'Invalid session type'}, status=400)
         
         try:
-            # Create game session
-            session = GameSession.objects.create(session_type=session_type)
-            
-            # Add participants
-            participants = []
+            # Work out participants
+            group = None
             if session_type == 'group' and group_id:
                 group = GroupChat.objects.get(id=group_id)
-                session.group = group
                 participants = list(group.members.all())
             elif session_type == 'direct' and participant_ids:
                 # Add current user and other participants, avoiding duplicates
@@ -944,15 +1097,30 @@ class CreateGameSessionView(APIView):
             else:
                 return Response({'error': 'Invalid participants'}, status=400)
             
-            # Use set to ensure no duplicate participants
-            session.participants.set(participants)
-            
             # Set turn order (randomize)
             turn_order = [p.id for p in participants]
             random.shuffle(turn_order)
-            session.turn_order = turn_order
-            session.current_turn_user = User.objects.get(id=turn_order[0])
-            session.save()
+            
+            # Create game session with everything in one INSERT
+            session = GameSession.objects.create(
+                session_type=session_type,
+                mode='large' if len(participants) >= settings.LARGE_ROOM_SIZE else 'standard',
+                group=group,
+                turn_order=turn_order,
+                turn_index=0,
+                current_turn_user_id=turn_order[0],
+                question_decks=build_decks()
+            )
+            
+            # Use set to ensure no duplicate participants
+            session.participants.set(participants)
+            
+            # Start every participant on the scoreboard at zero; large rooms add players as they score
+            if session.mode != 'large':
+                GameScore.objects.bulk_create([
+                    GameScore(session=session, player=p) for p in participants
+                ])
+            history.created(session)
             
             serializer = GameSessionSerializer(session)
             return Response(serializer.data, status=201)
@@ -965,69 +1133,75 @@ class GetRandomQuestionView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        from .models import Question, GameSession, GameRound, GameTurn
+        from .models import GameSession, GameRound, GameTurn
         from .serializers import GameRoundSerializer
-        import random
+        from .concurrency import StaleWrite
+        from .decks import draw_question
+        from .timers import round_deadline, round_timers
+        from . import engine, events, history
+        from django.db import transaction
+        from functools import partial
         
         session_id = request.data.get('session_id')
         category = request.data.get('category')
         
-        if not session_id or not category:
+        if not session_id or not category or not isinstance(category, str):
             return Response({'error': 'Session ID and category are required'}, status=400)
         
         try:
             session = GameSession.objects.get(id=session_id)
+            if session.is_hosted:
+                return Response({'error': 'This game is being played live; send actions over the game socket'}, status=409)
             
-            # Check if it's the current user's turn
-            print(f"Category pick attempt - User: {request.user.username}, Current turn: {session.current_turn_user.username if session.current_turn_user else 'None'}")
-            if session.current_turn_user != request.user:
+            # The engine's pick rules: the user's turn, and no round still being played.
+            # Two picks racing past this both try the versioned save below; one loses
+            print(f"Category pick attempt - User: {request.user.id}, Current turn: {session.current_turn_user_id}")
+            round_open = GameRound.objects.filter(session=session, is_completed=False).exists()
+            try:
+                engine.check_pick(request.user.id, session.current_turn_user_id, category, round_open)
+            except engine.NotYourTurn:
                 return Response({'error': f'Not your turn. Current turn: {session.current_turn_user.username if session.current_turn_user else "None"}'}, status=403)
+            except engine.RuleError as e:
+                return Response({'error': str(e)}, status=409)
             
-            # Get all questions in category
-            questions = Question.objects.filter(category=category)
-            
-            # Get already asked questions in this session
-            asked_question_ids = GameRound.objects.filter(
-                session=session
-            ).values_list('question_id', flat=True)
-            
-            # Filter out asked questions
-            available_questions = questions.exclude(id__in=asked_question_ids)
-            
-            if not available_questions:
-                return Response({'error': 'No more questions in this category'}, status=404)
-            
-            # Pick random question
-            question = random.choice(available_questions)
-            
-            # Create game round - this question is for ALL players
-            round_obj = GameRound.objects.create(
-                session=session,
-                question=question,
-                picker=request.user
-            )
-            
-            # Create answer slots for all participants (use get_or_create to prevent duplicates)
-            participants = session.participants.distinct()
-            print(f"Creating answer slots for {participants.count()} participants: {[p.username for p in participants]}")
-            for participant in participants:
-                turn, created = GameTurn.objects.get_or_create(
-                    round=round_obj,
-                    player=participant
-                )
-                if created:
-                    print(f"  Created turn for {participant.username}")
-                else:
-                    print(f"  Turn already exists for {participant.username}")
-            
-            # Refresh to get all related data
-            round_obj.refresh_from_db()
-            round_obj = GameRound.objects.prefetch_related(
-                'answers__player', 'question', 'picker'
-            ).get(id=round_obj.id)
+            # Create the round and an answer slot for every participant in one transaction;
+            # large rooms create each slot when its player first answers
+            is_large = session.mode == 'large'
+            participant_count = session.participants.count() if is_large else None
+            participants = [] if is_large else list(session.participants.distinct())
+            try:
+                with transaction.atomic():
+                    # Next question off the session's shuffled deck, so none repeat
+                    question = draw_question(session, category)
+                    if question is None:
+                        return Response({'error': 'No more questions in this category'}, status=404)
+                    
+                    # Only applies if the session is unchanged since it was read, so two
+                    # picks can't both draw from the same deck or start on a stale turn
+                    session.save_versioned(question_decks=session.question_decks)
+                    version = session.version
+                    round_obj = GameRound.objects.create(
+                        session=session,
+                        question=question,
+                        picker=request.user,
+                        player_count=participant_count or len(participants),
+                        version=version,
+                        deadline=round_deadline()
+                    )
+                    turns = GameTurn.objects.bulk_create([
+                        GameTurn(round=round_obj, player=participant, version=version)
+                        for participant in participants
+                    ])
+                    events.round_started(round_obj)
+                    history.picked(round_obj)
+                    if round_obj.deadline:
+                        transaction.on_commit(partial(round_timers.schedule_round, round_obj.id, round_obj.deadline))
+            except StaleWrite:
+                return Response({'error': 'The game changed while you were picking, please try again'}, status=409)
             
-            serializer = GameRoundSerializer(round_obj)
-            print(f"Created round {round_obj.id} with question {question.question_number} for {session.participants.count()} players")
+            # Serialize from the objects already in memory instead of re-fetching
+            serializer = GameRoundSerializer(round_obj, context={'answers': {round_obj.id: turns}})
+            print(f"Created round {round_obj.id} with question {question.question_number} for {round_obj.player_count} players")
             return Response({'round': serializer.data}, status=200)
         except GameSession.DoesNotExist:
             return Response({'error': 'Session not found'}, status=404)
@@ -1036,76 +1210,102 @@ class SubmitGameAnswerView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        from .models import GameTurn, GameRound
+        from .models import GameSession, GameTurn, GameRound, GameScore, PlayerStats
         from .serializers import GameTurnSerializer
+        from .scoring import score_round
+        from .timers import round_timers
+        from . import events, history
+        from django.db import transaction
+        from django.db.models import F
         from django.utils import timezone
+        from functools import partial
         
         round_id = request.data.get('round_id')
         answer = request.data.get('answer')
         
         if not round_id or not answer:
             return Response({'error': 'Round ID and answer are required'}, status=400)
+        if not isinstance(answer, str):
+            return Response({'error': 'Answer must be text'}, status=400)
         
         try:
-            round_obj = GameRound.objects.get(id=round_id)
-            turn = GameTurn.objects.get(round=round_obj, player=request.user)
-            
-            # Save answer
-            turn.answer = answer
-            turn.answered_at = timezone.now()
-            turn.save()
-            
-            # If this is the picker, save picker_answer
-            if round_obj.picker == request.user:
-                round_obj.picker_answer = answer
-                round_obj.save()
-            
-            # Check if all players have answered
-            all_answers = GameTurn.objects.filter(round=round_obj)
-            answered_count = all_answers.filter(answered_at__isnull=False).count()
-            total_players = all_answers.count()
-            
-            print(f"Answer submitted - Player: {request.user.username}, Round: {round_id}")
-            print(f"  Answered: {answered_count}/{total_players}")
+            round_obj = GameRound.objects.select_related('question', 'session').get(id=round_id)
+            if round_obj.session.is_hosted:
+                return Response({'error': 'This game is being played live; send actions over the game socket'}, status=409)
+            if round_obj.is_completed:
+                return Response({'error': 'This round is already over'}, status=409)
+            if round_obj.deadline and round_obj.deadline <= timezone.now():
+                return Response({'error': 'Time is up for this round'}, status=409)
+            is_large = round_obj.session.mode == 'large'
+            if is_large and round_obj.session.participants.filter(id=request.user.id).exists():
+                turn, _ = GameTurn.objects.get_or_create(round=round_obj, player=request.user)
+            else:
+                turn = GameTurn.objects.get(round=round_obj, player=request.user)
+            is_picker = round_obj.picker_id == request.user.id
             
-            round_completed = False
-            if answered_count == total_players:
-                print(f"  All players answered! Calculating points...")
-                # All players answered - calculate points
-                picker_answer = round_obj.picker_answer
-                points = round_obj.question.points
+            with transaction.atomic():
+                version = GameSession.bump_version(round_obj.session_id)
+                # The bump locks the session row, so a round completed by another answer shows here
+                if GameRound.objects.filter(pk=round_obj.pk, is_completed=True).exists():
+                    transaction.set_rollback(True)
+                    return Response({'error': 'This round is already over'}, status=409)
+                
+                # Save answer - only a player's first answer moves the round's counter
+                turn.answer = answer
+                turn.version = version
+                answered_at = timezone.now()
+                first_answer = GameTurn.objects.filter(pk=turn.pk, answered_at__isnull=True).update(
+                    answer=answer, answered_at=answered_at, version=version
+                )
+                round_changes = {'version': version}
+                if is_picker:
+                    round_changes['picker_answer'] = answer
+                if first_answer:
+                    turn.answered_at = answered_at
+                    round_changes['answered_count'] = F('answered_count') + 1
+                else:
+                    GameTurn.objects.filter(pk=turn.pk).update(answer=answer, version=version)
+                GameRound.objects.filter(pk=round_obj.pk).update(**round_changes)
+                history.answered(round_obj, request.user.id, answer)
                 
-                print(f"  Picker answer: {picker_answer}, Question points: {points}")
+                # Exactly one request sees the round flip to completed, even when the
+                # last answers arrive at the same time
+                round_completed = GameRound.objects.filter(
+                    pk=round_obj.pk,
+                    is_completed=False,
+                    answered_count__gte=F('player_count')
+                ).update(is_completed=True) == 1
                 
-                for turn_obj in all_answers:
-                    if turn_obj.player == round_obj.picker:
-                        # Picker gets points automatically
-                        turn_obj.points_earned = points
-                        print(f"  {turn_obj.player.username} (picker) earned {points} points")
-                    else:
-                        # Compare answer with picker's answer (simple contains check)
-                        if picker_answer and turn_obj.answer:
-                            # Award points if answers are similar
-                            if picker_answer.lower() in turn_obj.answer.lower() or turn_obj.answer.lower() in picker_answer.lower():
-                                turn_obj.points_earned = points
-                                print(f"  {turn_obj.player.username} earned {points} points (answer matches)")
-                            else:
-                                turn_obj.points_earned = 0
-                                print(f"  {turn_obj.player.username} earned 0 points (no match)")
-                        else:
-                            turn_obj.points_earned = 0
-                            print(f"  {turn_obj.player.username} earned 0 points (no answer)")
-                    turn_obj.save()
+                answered_count, total_players, picker_answer = GameRound.objects.filter(
+                    pk=round_obj.pk
+                ).values_list('answered_count', 'player_count', 'picker_answer').get()
                 
-                # Mark round as completed
-                round_obj.is_completed = True
-                round_obj.save()
-                round_completed = True
+                print(f"Answer submitted - Player: {request.user.username}, Round: {round_id}")
+                print(f"  Answered: {answered_count}/{total_players}")
+                if is_large:
+                    # Coalesced into one tally per interval, however many answers arrive
+                    transaction.on_commit(partial(round_timers.schedule_progress, round_obj.id))
+                elif first_answer:
+                    events.answer_progress(round_obj, request.user.id, answered_count, total_players)
                 
-                # Move to next turn
-                session = round_obj.session
-                session.next_turn()
-                print(f"  Round completed! Next turn: {session.current_turn_user.username}")
+                if round_completed:
+                    print(f"  All players answered! Calculating points...")
+                    # All players answered - score everyone in one pass
+                    print(f"  Picker answer: {picker_answer}, Question points: {round_obj.question.points}")
+                    points_by_player = score_round(round_obj, picker_answer, version)
+                    print(f"  Points awarded: {points_by_player}")
+                    
+                    # Add this round's points to the session scoreboard and the players' lifetime totals
+                    GameScore.add_points(round_obj.session_id, points_by_player)
+                    PlayerStats.record_round(points_by_player)
+                    turn.points_earned = points_by_player.get(turn.player_id, 0)
+                    
+                    # Move to next turn
+                    session = round_obj.session
+                    session.next_turn()
+                    print(f"  Round completed! Next turn: {session.current_turn_user_id}")
+                    events.round_completed(round_obj, picker_answer, points_by_player, session.current_turn_user_id)
+                    history.round_ended(round_obj, points_by_player, session)
             
             serializer = GameTurnSerializer(turn)
             return Response({
@@ -1125,71 +1325,160 @@ class GameSessionDetailView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, session_id):
-        from .models import GameSession, GameRound, GameTurn
+        """
+        Full game state, or with ?since=<version> only the rounds and turns that
+        changed after that version (304 if nothing has changed)
+        """
+        from .models import GameSession, GameRound, GameTurn, GameScore
         from .serializers import GameSessionSerializer, GameRoundSerializer
+        from .archive import load_snapshot
+        from django.db.models import Prefetch
+        
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return Response({'error': 'since must be an integer version'}, status=400)
         
         try:
-            session = GameSession.objects.get(id=session_id)
+            session = GameSession.objects.select_related('archive').get(id=session_id)
             
             # Check if user is participant
-            if request.user not in session.participants.all():
+            if not session.participants.filter(id=request.user.id).exists():
                 return Response({'error': 'Not a participant'}, status=403)
             
-            rounds = GameRound.objects.filter(session=session).prefetch_related(
-                'answers__player', 'question', 'picker'
+            if since is not None and session.version <= since:
+                return Response(status=304)
+            
+            # Archived games are served whole from their snapshot
+            archive = getattr(session, 'archive', None)
+            if archive is not None:
+                snapshot = load_snapshot(archive)
+                return Response({
+                    'session': GameSessionSerializer(session).data,
+                    'version': session.version,
+                    'since': since,
+                    'rounds': snapshot['rounds'],
+                    'current_round': None,
+                    'scores': snapshot['scores'],
+                    'archived': True
+                }, status=200)
+            
+            rounds = GameRound.objects.filter(session=session)
+            changed_rounds = rounds
+            answers = GameTurn.objects.select_related('player')
+            if since is not None:
+                changed_rounds = rounds.filter(version__gt=since)
+                answers = answers.filter(version__gt=since)
+            changed_rounds = changed_rounds.select_related('question', 'picker').prefetch_related(
+                Prefetch('answers', queryset=answers)
             )
             
             session_serializer = GameSessionSerializer(session)
-            rounds_serializer = GameRoundSerializer(rounds, many=True)
+            rounds_serializer = GameRoundSerializer(changed_rounds, many=True)
             
             # Get current active round (if any)
-            current_round = rounds.filter(is_completed=False).first()
-            if current_round:
-                print(f"Current round found: {current_round.id}, Question: {current_round.question.question_number}, Answers: {current_round.answers.count()}")
-                for answer in current_round.answers.all():
-                    print(f"  - Player: {answer.player.username}, Answered: {answer.answered_at is not None}")
+            current_round = rounds.filter(is_completed=False).select_related(
+                'question', 'picker'
+            ).prefetch_related('answers__player').first()
             current_round_data = GameRoundSerializer(current_round).data if current_round else None
             
-            # Calculate scores
-            scores = {}
-            for participant in session.participants.all():
-                player_turns = GameTurn.objects.filter(
-                    round__session=session,
-                    player=participant,
-                    answered_at__isnull=False
-                )
-                total_points = sum(t.points_earned for t in player_turns)
-                scores[participant.username] = total_points
+            # Scores are kept up to date by SubmitGameAnswerView
+            scores = dict(
+                GameScore.objects.filter(session=session).values_list('player__username', 'points')
+            )
             
             return Response({
                 'session': session_serializer.data,
+                'version': session.version,
+                'since': since,
                 'rounds': rounds_serializer.data,
                 'current_round': current_round_data,
-                'scores': scores
+                'scores': scores,
+                'archived': False
             }, status=200)
         except GameSession.DoesNotExist:
             return Response({'error': 'Session not found'}, status=404)
 
+class GameReplayView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, session_id):
+        """Stream the session's full history as newline-delimited JSON, one event per line, oldest first"""
+        from .models import GameSession
+        from .history import replay
+        from django.http import StreamingHttpResponse
+        import json
+        
+        if not GameSession.objects.filter(id=session_id).exists():
+            return Response({'error': 'Session not found'}, status=404)
+        if not GameSession.objects.filter(id=session_id, participants=request.user).exists():
+            return Response({'error': 'Not a participant'}, status=403)
+        
+        lines = (
+            json.dumps({'id': event_id, 'kind': kind, 'at': created_at.isoformat(), **data}) + '\n'
+            for event_id, kind, data, created_at in replay(session_id)
+        )
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
 class ActiveGameSessionsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
+        """The user's active games in full, with every participant; see GameDashboardView for the summary"""
         from .models import GameSession
         from .serializers import GameSessionSerializer
         
         sessions = GameSession.objects.filter(
             participants=request.user,
             is_active=True
-        )
+        ).select_related('current_turn_user', 'group__created_by').prefetch_related('participants', 'group__members')
         
         serializer = GameSessionSerializer(sessions, many=True)
         return Response({'sessions': serializer.data}, status=200)
 
+class GameDashboardView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """Lean summary of the user's active games, built in a fixed number of queries"""
+        from .dashboard import build_dashboard
+        
+        return Response({'sessions': build_dashboard(request.user)}, status=200)
+
+class GlobalLeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """Top players across all games, read from the materialized ranks"""
+        from . import leaderboard
+        
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 100)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=400)
+        
+        return Response({
+            'leaderboard': leaderboard.global_top(max(limit, 1)),
+            'me': leaderboard.my_global_entry(request.user)
+        }, status=200)
+
+class FriendsLeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """The user's rank among their friends, read from the materialized ranks"""
+        from . import leaderboard
+        
+        return Response({'leaderboard': leaderboard.friends_board(request.user)}, status=200)
+
 class DeleteGameSessionView(APIView):
     permission_classes = [IsAuthenticated]
     
     def delete(self, request, session_id):
         from .models import GameSession
+        from . import events
         
         try:
             session = GameSession.objects.get(id=session_id)
@@ -1198,8 +1487,13 @@ class DeleteGameSessionView(APIView):
             if request.user not in session.participants.all():
                 return Response({'error': 'Not a participant'}, status=403)
             
+            # Its host would go on flushing into the deleted rows
+            if session.is_hosted:
+                return Response({'error': 'This game is being played live; leave it before deleting'}, status=409)
+            
             # Delete the session (cascades to rounds and turns)
             session.delete()
+            events.session_deleted(session_id)
             print(f"Game session {session_id} deleted by {request.user.username}")
             
             return Response({'message': 'Game session deleted'}, status=200)